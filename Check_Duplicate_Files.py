@@ -1,62 +1,529 @@
 import os
 import sys
+import json
+import time
+import shutil
+import sqlite3
 import hashlib
+import tempfile
+import argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+PARTIAL_HASH_SIZE = 64 * 1024
+READ_BUFFER_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 0.5
+PARTIAL_HASH_NAME = f"partial{PARTIAL_HASH_SIZE // 1024}k:" + ("blake3" if blake3 else "xxh3_128" if xxhash else "blake2b")
+FULL_HASH_NAME = "blake3" if blake3 else "sha256"
+CACHE_MIN_AGE_NS = 2 * 10 ** 9
+FICLONE = 0x40049409
+KEEP_POLICIES = ('first', 'oldest', 'shortest')
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp', '.tif', '.tiff'}
+VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.webm', '.m4v', '.flv', '.wmv', '.3gp'}
+VIDEO_SAMPLE_POSITIONS = (0.1, 0.3, 0.5, 0.7, 0.9)
+HASH_INDEX_CHUNK_BITS = 16
+
+def get_partial_hasher():
+    if blake3:
+        return blake3.blake3()
+    if xxhash:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b()
+
+def get_full_hasher():
+    return blake3.blake3() if blake3 else hashlib.sha256()
 
 def get_file_hash(file_path, hash_algo=hashlib.md5):
     hasher = hash_algo()
+    buffer = bytearray(READ_BUFFER_SIZE)
+    view = memoryview(buffer)
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            while size := f.readinto(buffer):
+                hasher.update(view[:size])
+        return hasher.hexdigest()
+    except Exception as e:
+        print(f"Error reading file {file_path}: {e}")
+        return None
+
+def get_partial_hash(file_path, file_size):
+    hasher = get_partial_hasher()
     try:
         with open(file_path, 'rb') as f:
-            while chunk := f.read(4096):
-                hasher.update(chunk)
+            hasher.update(f.read(PARTIAL_HASH_SIZE))
+            f.seek(max(file_size - PARTIAL_HASH_SIZE, PARTIAL_HASH_SIZE))
+            hasher.update(f.read(PARTIAL_HASH_SIZE))
         return hasher.hexdigest()
     except Exception as e:
         print(f"Error reading file {file_path}: {e}")
         return None
 
-def find_duplicate_files(directory):
+def get_file_key(file_stat):
+    return file_stat.st_size, file_stat.st_dev, file_stat.st_ino, file_stat.st_mtime_ns
+
+def open_hash_cache(cache_path):
+    conn = sqlite3.connect(cache_path)
+    conn.execute('''CREATE TABLE IF NOT EXISTS file_hashes
+                    (device INTEGER, inode INTEGER, algorithm TEXT, size INTEGER, mtime_ns INTEGER,
+                     digest TEXT, path TEXT, last_seen REAL, PRIMARY KEY (device, inode, algorithm))''')
+    return conn
+
+def get_cached_hash(conn, file_key, algorithm):
+    size, device, inode, mtime_ns = file_key
+    if not inode:
+        return None
+    row = conn.execute("SELECT size, mtime_ns, digest FROM file_hashes WHERE device = ? AND inode = ? AND algorithm = ?",
+                       (device, inode, algorithm)).fetchone()
+    if row and row[0] == size and row[1] == mtime_ns:
+        return row[2]
+    return None
+
+def save_cached_hashes(conn, entries, algorithm):
+    now = time.time()
+    newest_mtime_ns = time.time_ns() - CACHE_MIN_AGE_NS
+    with conn:
+        conn.executemany("INSERT OR REPLACE INTO file_hashes VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         [(device, inode, algorithm, size, mtime_ns, digest, file_path, now)
+                          for file_path, (size, device, inode, mtime_ns), digest in entries
+                          if digest and inode and mtime_ns < newest_mtime_ns])
+
+def touch_cached_hashes(conn, file_keys, algorithm):
+    with conn:
+        conn.executemany("UPDATE file_hashes SET last_seen = ? WHERE device = ? AND inode = ? AND algorithm = ?",
+                         [(time.time(), device, inode, algorithm) for _, device, inode, _ in file_keys])
+
+def compact_hash_cache(conn, max_age_days):
+    with conn:
+        removed = conn.execute("DELETE FROM file_hashes WHERE last_seen < ?", (time.time() - max_age_days * 86400,)).rowcount
+    conn.execute("VACUUM")
+    return removed
+
+def hash_file_cached(conn, file_path, algorithm, hash_function):
+    file_key = get_file_key(os.stat(file_path))
+    digest = get_cached_hash(conn, file_key, algorithm) if conn else None
+    if digest is None:
+        digest = hash_function(file_path)
+        if conn:
+            save_cached_hashes(conn, [(file_path, file_key, digest)], algorithm)
+    return digest
+
+def report_progress(progress, message, force=False):
+    now = time.monotonic()
+    if force or now - progress["last_report"] >= PROGRESS_INTERVAL:
+        sys.stdout.write(f"{message}    \r")
+        sys.stdout.flush()
+        progress["last_report"] = now
+
+def scan_directory(directory):
+    files = []
+    subdirectories = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirectories.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        file_stat = entry.stat(follow_symlinks=False)
+                        # DirEntry.stat() leaves st_ino/st_dev at 0 on Windows
+                        if not file_stat.st_ino:
+                            file_stat = os.stat(entry.path, follow_symlinks=False)
+                        files.append((entry.path, get_file_key(file_stat)))
+                except OSError as e:
+                    print(f"Error reading file {entry.path}: {e}")
+    except OSError as e:
+        print(f"Error reading directory {directory}: {e}")
+    return files, subdirectories
+
+def scan_files(directory, workers=16):
+    files = []
+    directories = 0
+    progress = {"last_report": 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(scan_directory, directory)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                directory_files, subdirectories = future.result()
+                files.extend(directory_files)
+                directories += 1
+                pending.update(executor.submit(scan_directory, subdirectory) for subdirectory in subdirectories)
+            report_progress(progress, f"Scanning: {len(files)} files in {directories} directories")
+    report_progress(progress, f"Scanned: {len(files)} files in {directories} directories", force=True)
+    files.sort()
+    return files
+
+def hash_files(executor, file_paths, hash_function, label, file_keys, algorithm, cache=None):
+    hashes = {}
+    if cache:
+        for file_path in file_paths:
+            digest = get_cached_hash(cache, file_keys[file_path], algorithm)
+            if digest:
+                hashes[file_path] = digest
+        touch_cached_hashes(cache, [file_keys[file_path] for file_path in hashes], algorithm)
+    progress = {"last_report": 0}
+    futures = {executor.submit(hash_function, file_path): file_path for file_path in file_paths if file_path not in hashes}
+    pending = set(futures)
+    while pending:
+        done, pending = wait(pending, timeout=PROGRESS_INTERVAL, return_when=FIRST_COMPLETED)
+        for future in done:
+            hashes[futures[future]] = future.result()
+        report_progress(progress, f"{label}: {len(hashes)}/{len(file_paths)} files")
+    if futures:
+        report_progress(progress, f"{label}: {len(hashes)}/{len(file_paths)} files", force=True)
+    if cache:
+        save_cached_hashes(cache, [(file_path, file_keys[file_path], hashes[file_path]) for file_path in futures.values()], algorithm)
+    return hashes, list(futures.values())
+
+def group_by(file_paths, file_keys, hashes):
+    groups = {}
+    for file_path in file_paths:
+        file_hash = hashes.get(file_path)
+        if file_hash is not None:
+            groups.setdefault((file_keys[file_path][0], file_hash), []).append(file_path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicate_groups(directory, scan_workers=16, hash_workers=8, cache=None):
+    files = scan_files(directory, scan_workers)
+    file_keys = dict(files)
+    stats = {"files": len(files), "total_bytes": sum(file_key[0] for _, file_key in files), "bytes_read": 0}
+    sizes = {}
+    for file_path, file_key in files:
+        sizes.setdefault(file_key[0], []).append(file_path)
+
     hash_map = {}
-    for root, _, files in os.walk(directory):
-        for file in files:
-            file_path = os.path.join(root, file)
-            sys.stdout.write(f"Checking: {file_path}    \r")
-            sys.stdout.flush()
-            file_hash = get_file_hash(file_path)
-            if file_hash:
-                if file_hash in hash_map:
-                    hash_map[file_hash].append(file_path)
-                    print(f"Duplicate: {hash_map[file_hash][0]} -> {file_path}")
+    small_groups = []
+    large_groups = []
+    for file_size, same_size in sizes.items():
+        if len(same_size) < 2:
+            continue
+        if file_size == 0:
+            hash_map[get_full_hasher().hexdigest()] = same_size
+        elif file_size > 2 * PARTIAL_HASH_SIZE:
+            large_groups.append(same_size)
+        else:
+            small_groups.append(same_size)
+
+    with ThreadPoolExecutor(max_workers=hash_workers) as executor:
+        partial_paths = [file_path for group in large_groups for file_path in group]
+        partial_hashes, hashed_paths = hash_files(executor, partial_paths,
+                                                  lambda file_path: get_partial_hash(file_path, file_keys[file_path][0]),
+                                                  "Partial hashing", file_keys, PARTIAL_HASH_NAME, cache)
+        stats["bytes_read"] += len(hashed_paths) * 2 * PARTIAL_HASH_SIZE
+        candidates = small_groups + group_by(partial_paths, file_keys, partial_hashes)
+        full_paths = [file_path for group in candidates for file_path in group]
+        full_hashes, hashed_paths = hash_files(executor, full_paths, lambda file_path: get_file_hash(file_path, get_full_hasher),
+                                               "Full hashing", file_keys, FULL_HASH_NAME, cache)
+        stats["bytes_read"] += sum(file_keys[file_path][0] for file_path in hashed_paths)
+    for group in group_by(full_paths, file_keys, full_hashes):
+        hash_map[full_hashes[group[0]]] = group
+    return hash_map, stats
+
+def get_difference_hash(pixels):
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            value = (value << 1) | (pixels[row * 9 + column + 1] > pixels[row * 9 + column])
+    return value
+
+def get_image_hash(file_path):
+    try:
+        with Image.open(file_path) as image:
+            image.draft('L', (64, 64))
+            pixels = image.convert('L').resize((9, 8), Image.LANCZOS).tobytes()
+        return f"{get_difference_hash(pixels):016x}"
+    except Exception as e:
+        print(f"Error reading image {file_path}: {e}")
+        return None
+
+def get_video_hash(file_path):
+    capture = cv2.VideoCapture(file_path)
+    try:
+        frame_count = capture.get(cv2.CAP_PROP_FRAME_COUNT)
+        value = 0
+        for position in VIDEO_SAMPLE_POSITIONS:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, int(frame_count * position))
+            success, frame = capture.read()
+            if not success:
+                return None
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            pixels = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).flatten().tolist()
+            value = (value << 64) | get_difference_hash(pixels)
+        return f"{value:0{16 * len(VIDEO_SAMPLE_POSITIONS)}x}"
+    except Exception as e:
+        print(f"Error reading video {file_path}: {e}")
+        return None
+    finally:
+        capture.release()
+
+def get_hamming_distance(first, second):
+    return bin(first ^ second).count('1')
+
+def get_flip_masks(bits, radius):
+    masks = [0]
+    for _ in range(radius):
+        masks = list({mask | (1 << bit) for mask in masks for bit in range(bits)} | set(masks))
+    return masks
+
+def build_hash_index(hashes, hash_bits):
+    chunk_mask = (1 << HASH_INDEX_CHUNK_BITS) - 1
+    index = [{} for _ in range(hash_bits // HASH_INDEX_CHUNK_BITS)]
+    for value in hashes:
+        for chunk, table in enumerate(index):
+            table.setdefault((value >> (chunk * HASH_INDEX_CHUNK_BITS)) & chunk_mask, []).append(value)
+    return index
+
+def search_hash_index(index, flip_masks, value, threshold):
+    chunk_mask = (1 << HASH_INDEX_CHUNK_BITS) - 1
+    candidates = set()
+    for chunk, table in enumerate(index):
+        key = (value >> (chunk * HASH_INDEX_CHUNK_BITS)) & chunk_mask
+        for flip_mask in flip_masks:
+            bucket = table.get(key ^ flip_mask)
+            if bucket:
+                candidates.update(bucket)
+    return [candidate for candidate in candidates if get_hamming_distance(value, candidate) <= threshold]
+
+def group_similar(hashes, hash_bits, threshold):
+    index = build_hash_index(hashes, hash_bits)
+    flip_masks = get_flip_masks(HASH_INDEX_CHUNK_BITS, threshold // len(index))
+    grouped = set()
+    groups = []
+    for value in sorted(hashes, key=lambda value: hashes[value][0]):
+        if value in grouped:
+            continue
+        matches = [match for match in search_hash_index(index, flip_masks, value, threshold) if match not in grouped]
+        file_paths = sorted(file_path for match in matches for file_path in hashes[match])
+        if len(file_paths) > 1:
+            grouped.update(matches)
+            groups.append(file_paths)
+    return groups
+
+def find_similar_media(directory, threshold=6, workers=None, cache=None):
+    files = scan_files(directory)
+    file_keys = dict(files)
+    media_kinds = []
+    if Image:
+        media_kinds.append(("images", IMAGE_EXTENSIONS, get_image_hash, "dhash64", 64, threshold))
+    else:
+        print("Image similarity requires Pillow. Install it with: pip install pillow")
+    if cv2:
+        media_kinds.append(("videos", VIDEO_EXTENSIONS, get_video_hash, f"video-dhash{len(VIDEO_SAMPLE_POSITIONS)}x64",
+                            64 * len(VIDEO_SAMPLE_POSITIONS), threshold * len(VIDEO_SAMPLE_POSITIONS)))
+    else:
+        print("Video similarity requires OpenCV. Install it with: pip install opencv-python")
+
+    similar_groups = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for kind, extensions, hash_function, algorithm, hash_bits, kind_threshold in media_kinds:
+            file_paths = [file_path for file_path, _ in files if os.path.splitext(file_path)[1].lower() in extensions]
+            digests, _ = hash_files(executor, file_paths, hash_function, f"Hashing {kind}", file_keys, algorithm, cache)
+            hashes = {}
+            for file_path in file_paths:
+                if digests.get(file_path):
+                    hashes.setdefault(int(digests[file_path], 16), []).append(file_path)
+            similar_groups[kind] = group_similar(hashes, hash_bits, kind_threshold)
+    return similar_groups
+
+def find_similar_files(directory, threshold=6, workers=None, cache=None, report_file=None):
+    similar_groups = find_similar_media(directory, threshold, workers, cache)
+    print("\n")
+    for kind, groups in similar_groups.items():
+        print(f"Similar {kind}: {len(groups)} groups, {sum(len(group) for group in groups)} files")
+        for group in groups:
+            print(f"  {', '.join(group)}")
+    if report_file:
+        with open(report_file, 'w') as file:
+            json.dump({"directory": directory, "threshold": threshold, "groups": similar_groups}, file, indent=4)
+        print(f"=> The report has been saved in {os.path.abspath(report_file)}")
+    return similar_groups
+
+def order_group(file_list, keep='first', prefer=None):
+    prefer_roots = [os.path.join(os.path.abspath(root), '') for root in prefer or []]
+
+    def sort_key(file_path):
+        preferred = any(os.path.abspath(file_path).startswith(root) for root in prefer_roots)
+        if keep == 'oldest':
+            policy_key = os.stat(file_path).st_mtime_ns
+        elif keep == 'shortest':
+            policy_key = len(file_path)
+        else:
+            policy_key = 0
+        return not preferred, policy_key, file_path
+
+    return sorted(file_list, key=sort_key)
+
+def files_identical(first_path, second_path):
+    with open(first_path, 'rb', buffering=0) as first, open(second_path, 'rb', buffering=0) as second:
+        while True:
+            first_chunk = first.read(READ_BUFFER_SIZE)
+            if first_chunk != second.read(READ_BUFFER_SIZE):
+                return False
+            if not first_chunk:
+                return True
+
+def replace_duplicate(keeper, duplicate, action):
+    if action == 'delete':
+        os.remove(duplicate)
+        return
+    directory, name = os.path.split(duplicate)
+    temp_path = None
+    try:
+        if action == 'hardlink':
+            # os.link never overwrites, so retry with a new name until this call owns one
+            while temp_path is None:
+                candidate = os.path.join(directory, f".{name}.{os.urandom(4).hex()}.dedupe-tmp")
+                try:
+                    os.link(keeper, candidate)
+                except FileExistsError:
+                    continue
+                temp_path = candidate
+        else:
+            if fcntl is None:
+                raise OSError("reflinks are not supported on this platform")
+            fd, temp_path = tempfile.mkstemp(prefix=f".{name}.", suffix='.dedupe-tmp', dir=directory or '.')
+            with os.fdopen(fd, 'wb') as target, open(keeper, 'rb') as source:
+                fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+            shutil.copystat(duplicate, temp_path)
+        os.replace(temp_path, duplicate)
+        temp_path = None
+    finally:
+        if temp_path is not None:
+            os.remove(temp_path)
+
+def resolve_duplicates(hash_map, action, dry_run=False):
+    report = {"action": action, "dry_run": dry_run, "groups": [], "files_resolved": 0, "reclaimed_bytes": 0, "errors": 0}
+    for file_hash, file_list in hash_map.items():
+        keeper = file_list[0]
+        group = {"hash": file_hash, "kept": keeper, "duplicates": []}
+        report["groups"].append(group)
+        try:
+            keeper_stat = os.stat(keeper)
+        except OSError as e:
+            group["error"] = str(e)
+            report["errors"] += 1
+            print(f"Error reading {keeper}: {e}")
+            continue
+        group["size"] = keeper_stat.st_size
+        for duplicate in file_list[1:]:
+            entry = {"path": duplicate}
+            try:
+                duplicate_stat = os.stat(duplicate)
+                if (duplicate_stat.st_dev, duplicate_stat.st_ino) == (keeper_stat.st_dev, keeper_stat.st_ino):
+                    entry.update(status="skipped", reason="already linked to the kept file")
+                elif action == 'hardlink' and duplicate_stat.st_dev != keeper_stat.st_dev:
+                    entry.update(status="skipped", reason="on a different filesystem than the kept file")
+                elif not files_identical(keeper, duplicate):
+                    entry.update(status="skipped", reason="contents differ from the kept file")
                 else:
-                    hash_map[file_hash] = [file_path]
+                    if not dry_run:
+                        replace_duplicate(keeper, duplicate, action)
+                    entry["status"] = {"delete": "deleted", "hardlink": "hardlinked", "reflink": "reflinked"}[action]
+                    if action == 'reflink' or duplicate_stat.st_nlink == 1:
+                        entry["reclaimed_bytes"] = duplicate_stat.st_size
+                        report["reclaimed_bytes"] += duplicate_stat.st_size
+                    report["files_resolved"] += 1
+            except OSError as e:
+                entry.update(status="error", reason=str(e))
+                report["errors"] += 1
+            print(f"{entry['status'].capitalize()}: {duplicate}" + (f" ({entry['reason']})" if entry.get("reason") else ""))
+            group["duplicates"].append(entry)
+    return report
+
+def find_duplicate_files(directory, cache=None, action=None, keep='first', prefer=None, dry_run=False, report_file=None):
+    hash_map, stats = find_duplicate_groups(directory, cache=cache)
+    hash_map = {file_hash: order_group(file_list, keep, prefer) for file_hash, file_list in hash_map.items()}
+    for file_hash, file_list in hash_map.items():
+        for file_path in file_list[1:]:
+            print(f"Duplicate: {file_list[0]} -> {file_path}")
 
     print("\n")
+    read_percent = stats["bytes_read"] * 100 / stats["total_bytes"] if stats["total_bytes"] else 0
+    print(f"Scanned {stats['files']} files, read {stats['bytes_read']} of {stats['total_bytes']} bytes ({read_percent:.1f}%)")
     total_duplicates = sum(len(v) - 1 for v in hash_map.values() if len(v) > 1)
     total_groups = sum(1 for v in hash_map.values() if len(v) > 1)
     print(f"Total duplicate files: {total_duplicates}, Total duplicate groups: {total_groups}")
-    files_to_delete = []
+    if action:
+        report = resolve_duplicates(hash_map, action, dry_run)
+        report.update(directory=directory, keep=keep, prefer=prefer or [], scanned_files=stats["files"])
+        print(f"Resolved {report['files_resolved']} duplicates, reclaimed {report['reclaimed_bytes']} bytes, {report['errors']} errors")
+        if report_file:
+            with open(report_file, 'w') as file:
+                json.dump(report, file, indent=4)
+            print(f"=> The report has been saved in {os.path.abspath(report_file)}")
+        return report
+
     if total_duplicates > 0:
         print("Summary of duplicate files:")
         for file_hash, file_list in hash_map.items():
             if len(file_list) > 1:
                 print(f"{file_hash}: {', '.join(file_list)}")
-                files_to_delete.extend(file_list[1:])
 
-        print(f"Total files to be deleted: {len(files_to_delete)}")
+        print(f"Total files to be deleted: {total_duplicates}")
         confirm = input("Do you want to delete duplicate files? (y/n): ")
         if confirm.lower() == 'y':
-            for file in files_to_delete:
-                try:
-                    os.remove(file)
-                    print(f"Deleted: {file}")
-                except Exception as e:
-                    print(f"Error deleting {file}: {e}")
+            resolve_duplicates(hash_map, 'delete')
         else:
             print("Duplicate file deletion canceled.")
     else:
         print("No duplicate files found.")
 
 if __name__ == "__main__":
-    folder_path = input("Enter the directory path to check: ")
-    if os.path.isdir(folder_path):
-        find_duplicate_files(folder_path)
+    parser = argparse.ArgumentParser(description='Find duplicate files in a directory')
+    parser.add_argument('directory', nargs='?', help='Directory to check (prompted for if omitted)')
+    parser.add_argument('--cache', metavar='CACHE_DB', help='SQLite hash cache, so unchanged files are not re-read on later runs')
+    parser.add_argument('--compact-cache', type=int, metavar='DAYS', help='Remove cache entries not seen for this many days, then exit')
+    parser.add_argument('--action', choices=['delete', 'hardlink', 'reflink'],
+                        help='Resolve duplicates without prompting: delete them or replace them with hardlinks/reflinks to the kept copy')
+    parser.add_argument('--keep', choices=KEEP_POLICIES, default='first',
+                        help='Which copy to keep: first in path order, oldest modification time or shortest path (default: first)')
+    parser.add_argument('--prefer', nargs='+', metavar='ROOT', help='Keep copies under these directories before applying --keep')
+    parser.add_argument('--dry-run', action='store_true', help='With --action, verify and report without changing any file')
+    parser.add_argument('--report', metavar='REPORT_JSON', help='With --action or --similar, write a JSON report of every group')
+    parser.add_argument('--similar', action='store_true',
+                        help='Find re-encoded or resized copies of images and videos with perceptual hashes instead of exact duplicates')
+    parser.add_argument('--threshold', type=int, default=6, help='With --similar, maximum differing bits out of 64 per image or video frame (default: 6)')
+    parser.add_argument('--workers', type=int, help='With --similar, number of hashing processes (default: number of CPUs)')
+    args = parser.parse_args()
+
+    cache = open_hash_cache(args.cache) if args.cache else None
+    if args.compact_cache is not None:
+        if cache:
+            print(f"Removed {compact_hash_cache(cache, args.compact_cache)} stale cache entries.")
+        else:
+            print("--compact-cache requires --cache.")
+        sys.exit()
+
+    folder_path = args.directory or input("Enter the directory path to check: ")
+    if os.path.isdir(folder_path) and args.similar:
+        find_similar_files(folder_path, args.threshold, args.workers, cache, args.report)
+    elif os.path.isdir(folder_path):
+        find_duplicate_files(folder_path, cache, args.action, args.keep, args.prefer, args.dry_run, args.report)
     else:
-        print("Invalid directory.")
\ No newline at end of file
+        print("Invalid directory.")
+    if cache:
+        cache.close()
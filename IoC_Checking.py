@@ -10,6 +10,7 @@ import requests
 import argparse
 from colorama import Fore
 from datetime import datetime
+from Check_Duplicate_Files import open_hash_cache, hash_file_cached
 
 API_KEY_FILE = 'api_key.txt'
 
@@ -295,6 +296,7 @@ def parse_arguments():
     parser.add_argument('-sha1', nargs='+', metavar='SHA1', help='Check one or more SHA1 hashes')
     parser.add_argument('-d', nargs='+', metavar='DOMAIN', help='Check one or more domains')
     parser.add_argument('-dir', '--directory', metavar='DIRECTORY', help='Check all files in a directory')
+    parser.add_argument('--cache', metavar='CACHE_DB', help='SQLite hash cache (may be the same file as Check_Duplicate_Files --cache), so unchanged files are not re-hashed')
     parser.add_argument('-f', '--file', metavar='FILE', help='Check IoCs from a file containing one IoC per line')
     parser.add_argument('-o', '--output', metavar='OUTPUT_FILE', help='Save results to a file')
     parser.add_argument('-t', '--type', choices=['csv', 'db', 'txt'], default='txt',
@@ -400,12 +402,15 @@ def main():
                 if not files:
                     print(f"The directory {args.directory} is empty.")
                 else:
+                    cache = open_hash_cache(args.cache) if args.cache else None
                     with open('hashes.txt', 'w') as hashes_file:
                         for root, dirs, files in os.walk(args.directory):
                             for file in files:
                                 file_path = os.path.join(root, file)
-                                md5 = calculate_md5_hash(file_path)
+                                md5 = hash_file_cached(cache, file_path, 'md5', calculate_md5_hash)
                                 hashes_file.write(md5 + '\n')
+                    if cache:
+                        cache.close()
 
                     with open('hashes.txt', 'r') as hashes_file:
                         for line in hashes_file:
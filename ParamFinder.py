@@ -1,16 +1,59 @@
 import os
-import re
+import sys
+import json
+import queue
+import sqlite3
+import hashlib
+import tempfile
 import time
 import errno
 import random
+import threading
 import argparse
 import requests
 import subprocess
 from colorama import Fore
-from urllib.parse import unquote
+from urllib.parse import unquote, urlsplit
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait, as_completed
 
 start_time = time.time()
 
+CDX_URL = "https://web.archive.org/cdx/search/cdx"
+COMMON_CRAWL_INDEXES_URL = "https://index.commoncrawl.org/collinfo.json"
+OTX_URL = "https://otx.alienvault.com/api/v1/indicators/{kind}/{domain}/url_list"
+SOURCE_BATCH_SIZE = 1000
+DEDUPE_MEMORY_LIMIT = 1000000
+STATE_FILE = os.path.join('output', 'state.json')
+
+user_agent_list = [
+    # Chrome
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 5.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 6.2; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/44.0.2403.157 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 6.3; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36',
+    'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36',
+    # Firefox
+    'Mozilla/4.0 (compatible; MSIE 9.0; Windows NT 6.1)',
+    'Mozilla/5.0 (Windows NT 6.1; WOW64; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.1; WOW64; Trident/5.0)',
+    'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (Windows NT 6.2; WOW64; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (Windows NT 10.0; WOW64; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.0; Trident/5.0)',
+    'Mozilla/5.0 (Windows NT 6.3; WOW64; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.1; Trident/5.0)',
+    'Mozilla/5.0 (Windows NT 6.1; Win64; x64; Trident/7.0; rv:11.0) like Gecko',
+    'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.1; WOW64; Trident/6.0)',
+    'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.1; Trident/6.0)',
+    'Mozilla/4.0 (compatible; MSIE 8.0; Windows NT 5.1; Trident/4.0; .NET CLR 2.0.50727; .NET CLR 3.0.4506.2152; .NET CLR 3.5.30729)'
+]
+
 def save_func(final_urls, outfile, domain):
     filename = os.path.join('output', f'{outfile if outfile else domain}.txt')
     os.makedirs(os.path.dirname(filename), exist_ok=True)
@@ -18,107 +61,556 @@ def save_func(final_urls, outfile, domain):
         for url in final_urls:
             f.write(url + "\n")
 
-def connector(url):
-    user_agent_list = [
-        # Chrome
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 5.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 6.2; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.90 Safari/537.36',
-        'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/44.0.2403.157 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 6.3; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/60.0.3112.113 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/57.0.2987.133 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36',
-        'Mozilla/5.0 (Windows NT 6.1; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/55.0.2883.87 Safari/537.36',
-        # Firefox
-        'Mozilla/4.0 (compatible; MSIE 9.0; Windows NT 6.1)',
-        'Mozilla/5.0 (Windows NT 6.1; WOW64; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.1; WOW64; Trident/5.0)',
-        'Mozilla/5.0 (Windows NT 6.1; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (Windows NT 6.2; WOW64; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (Windows NT 10.0; WOW64; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.0; Trident/5.0)',
-        'Mozilla/5.0 (Windows NT 6.3; WOW64; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (compatible; MSIE 9.0; Windows NT 6.1; Trident/5.0)',
-        'Mozilla/5.0 (Windows NT 6.1; Win64; x64; Trident/7.0; rv:11.0) like Gecko',
-        'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.1; WOW64; Trident/6.0)',
-        'Mozilla/5.0 (compatible; MSIE 10.0; Windows NT 6.1; Trident/6.0)',
-        'Mozilla/4.0 (compatible; MSIE 8.0; Windows NT 5.1; Trident/4.0; .NET CLR 2.0.50727; .NET CLR 3.0.4506.2152; .NET CLR 3.5.30729)'
-    ]
-    headers = {'User-Agent': random.choice(user_agent_list)}
+def merge_output(final_urls, outfile, domain):
+    filename = os.path.join('output', f'{outfile if outfile else domain}.txt')
+    existing = {}
+    if os.path.exists(filename):
+        with open(filename, encoding="utf-8") as f:
+            existing = dict.fromkeys(line.rstrip("\n") for line in f if line.strip())
+    new_urls = [url for url in final_urls if url not in existing]
+    all_urls = list(existing) + new_urls
+    save_func(all_urls, outfile, domain)
+    return all_urls, new_urls
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    with open(STATE_FILE, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+
+def create_session(workers):
+    session = requests.Session()
+    session.headers['User-Agent'] = random.choice(user_agent_list)
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def create_rate_limiter(requests_per_second):
+    return {"rate": requests_per_second, "next_slot": time.monotonic(), "lock": threading.Lock()}
+
+def throttle_requests(limiter):
+    if not limiter or not limiter["rate"]:
+        return
+    with limiter["lock"]:
+        now = time.monotonic()
+        slot = max(now, limiter["next_slot"])
+        limiter["next_slot"] = slot + 1 / limiter["rate"]
+    if slot > now:
+        time.sleep(slot - now)
+
+def connector(session, limiter, url, params, retries):
+    for attempt in range(retries + 1):
+        throttle_requests(limiter)
+        try:
+            response = session.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            return response.text, attempt
+        except requests.exceptions.RequestException as e:
+            print(f"\u001b[31;1m{e}.\u001b[0m")
+            if attempt < retries:
+                time.sleep(min(2 ** attempt, 30) + random.random())
+    return None, retries
+
+def get_page_count(session, limiter, cdx_url, params, retries):
+    text, used = connector(session, limiter, cdx_url, {**params, 'showNumPages': 'true'}, retries)
+    if text is None:
+        return None, used
+    try:
+        return int(text.strip()), used
+    except ValueError:
+        pass
+    try:
+        # The Common Crawl index answers with a JSON object instead of a bare number
+        return int(json.loads(text)['pages']), used
+    except (ValueError, KeyError, TypeError):
+        return 1, used
+
+def fetch_page(session, limiter, cdx_url, params, page, retries):
+    text, used = connector(session, limiter, cdx_url, {**params, 'page': page}, retries)
+    if text is None:
+        return None, used
+    return text.splitlines(), used
+
+def parse_wayback_line(line):
+    timestamp, _, url = line.partition(' ')
+    return timestamp, unquote(url)
+
+def iter_cdx_lines(session, limiter, cdx_url, params, workers, retries, stats, parse_line=parse_wayback_line):
+    pages, used = get_page_count(session, limiter, cdx_url, params, retries)
+    stats['retries'] += used
+    if pages is None:
+        stats['pages'] += 1
+        stats['failed_pages'] += 1
+        return
+    stats['pages'] += pages
+
+    # Only `workers` pages are requested at a time, which bounds memory to that many pages
+    next_page = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        while next_page < pages or pending:
+            while next_page < pages and len(pending) < workers:
+                pending.add(executor.submit(fetch_page, session, limiter, cdx_url, params, next_page, retries))
+                next_page += 1
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                lines, used = future.result()
+                stats['retries'] += used
+                if lines is None:
+                    stats['failed_pages'] += 1
+                    continue
+                for line in lines:
+                    timestamp, url = parse_line(line)
+                    if not url:
+                        continue
+                    if timestamp and timestamp > stats.get('latest', ''):
+                        stats['latest'] = timestamp
+                    yield url
+
+def iter_wayback_urls(session, limiter, domain, args, stats, since=None):
+    params = {'url': f"{'*.' if args.subs else ''}{domain}/*", 'output': 'txt', 'fl': 'timestamp,original',
+              'collapse': 'urlkey'}
+    if since:
+        params['from'] = since
+    yield from iter_cdx_lines(session, limiter, CDX_URL, params, max(1, args.threads), args.retries, stats)
+
+def parse_common_crawl_line(line):
+    try:
+        capture = json.loads(line)
+    except ValueError:
+        return None, None
+    return capture.get('timestamp'), unquote(capture.get('url', ''))
 
+def iter_common_crawl_urls(session, limiter, domain, args, stats, since=None):
+    text, used = connector(session, limiter, COMMON_CRAWL_INDEXES_URL, None, args.retries)
+    stats['retries'] += used
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text, False
-    except requests.exceptions.RequestException as e:
-        print(f"\u001b[31;1m{e}.\u001b[0m")
-        return None, True
-
-def param_extract(response, level, black_list, placeholder):
-    parsed = list(set(re.findall(r'.*?:\/\/.*\?.*\=[^$]', response)))
-    final_uris = []
-
-    for i in parsed:
-        delim = i.find('=')
-        second_delim = i.find('=', delim + 1)
-        if not any(ext in i for ext in black_list):
-            if placeholder:
-                final_uris.append(i[:delim + 1] + placeholder)
-                if level == 'high' and second_delim != -1:
-                    final_uris.append(i[:second_delim + 1] + placeholder)
-            else:
-                final_uris.append(i[:delim + 1])
-                if level == 'high' and second_delim != -1:
-                    final_uris.append(i[:second_delim + 1])
-
-    return list(set(final_uris))
+        indexes = json.loads(text) if text else []
+    except ValueError:
+        indexes = []
+    if not indexes:
+        stats['pages'] += 1
+        stats['failed_pages'] += 1
+        return
+
+    params = {'url': f"{'*.' if args.subs else ''}{domain}/*", 'output': 'json', 'fl': 'timestamp,url'}
+    if since:
+        params['from'] = since
+    for index in indexes[:max(1, args.cc_indexes)]:
+        yield from iter_cdx_lines(session, limiter, index['cdx-api'], params, max(1, args.threads), args.retries,
+                                  stats, parse_common_crawl_line)
+
+def iter_otx_urls(session, limiter, domain, args, stats, since=None):
+    url = OTX_URL.format(kind='domain' if args.subs else 'hostname', domain=domain)
+    page = 1
+    while True:
+        text, used = connector(session, limiter, url, {'limit': 500, 'page': page}, args.retries)
+        stats['retries'] += used
+        stats['pages'] += 1
+        try:
+            data = json.loads(text) if text else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            stats['failed_pages'] += 1
+            return
+        for entry in data.get('url_list', []):
+            if entry.get('url'):
+                yield unquote(entry['url'])
+        if not data.get('has_next'):
+            return
+        page += 1
+
+def matches_domain(url, domain, subs):
+    try:
+        host = urlsplit(url).hostname or ''
+    except ValueError:
+        return False
+    return host == domain or (subs and host.endswith('.' + domain))
+
+def iter_file_urls(path, domain, subs):
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+    try:
+        for line in f:
+            url = unquote(line.strip())
+            if url and matches_domain(url, domain, subs):
+                yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def spool_input_urls(path, domains, subs, directory=None):
+    # Batch mode reads the input once and files every URL under each listed domain it belongs to
+    fd, db_path = tempfile.mkstemp(prefix='paramfinder-input-', suffix='.db', dir=directory)
+    os.close(fd)
+    domain_set = set(domains)
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode=OFF')
+    conn.execute('PRAGMA synchronous=OFF')
+    conn.execute('CREATE TABLE urls (domain TEXT, url TEXT)')
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8', errors='replace')
+    try:
+        batch = []
+        for line in f:
+            url = unquote(line.strip())
+            try:
+                host = urlsplit(url).hostname or ''
+            except ValueError:
+                continue
+            labels = host.split('.')
+            candidates = ['.'.join(labels[i:]) for i in range(len(labels))] if subs else [host]
+            batch.extend((domain, url) for domain in candidates if domain in domain_set)
+            if len(batch) >= SOURCE_BATCH_SIZE:
+                conn.executemany('INSERT INTO urls VALUES (?, ?)', batch)
+                batch = []
+        conn.executemany('INSERT INTO urls VALUES (?, ?)', batch)
+        conn.execute('CREATE INDEX idx_urls_domain ON urls (domain)')
+        conn.commit()
+    finally:
+        conn.close()
+        if f is not sys.stdin:
+            f.close()
+    return db_path
+
+def iter_spooled_urls(db_path, domain):
+    conn = sqlite3.connect(db_path)
+    try:
+        for (url,) in conn.execute('SELECT url FROM urls WHERE domain = ?', (domain,)):
+            yield url
+    finally:
+        conn.close()
+
+url_sources = {
+    'wayback': iter_wayback_urls,
+    'commoncrawl': iter_common_crawl_urls,
+    'otx': iter_otx_urls,
+}
+
+def iter_merged_urls(iterators):
+    if len(iterators) == 1:
+        yield from iterators[0]
+        return
+
+    batches = queue.Queue(maxsize=len(iterators) * 4)
+
+    def drain(iterator):
+        batch = []
+        try:
+            for url in iterator:
+                batch.append(url)
+                if len(batch) >= SOURCE_BATCH_SIZE:
+                    batches.put(batch)
+                    batch = []
+            if batch:
+                batches.put(batch)
+        except Exception as e:
+            print(f"\u001b[31;1m{e}.\u001b[0m")
+        finally:
+            batches.put(None)
+
+    for iterator in iterators:
+        threading.Thread(target=drain, args=(iterator,), daemon=True).start()
+
+    remaining = len(iterators)
+    while remaining:
+        batch = batches.get()
+        if batch is None:
+            remaining -= 1
+        else:
+            yield from batch
+
+def create_url_filter(directory=None, memory_limit=DEDUPE_MEMORY_LIMIT):
+    # Digests stay in a set up to memory_limit keys, then move to a temporary SQLite table
+    seen = set()
+    store = {}
+
+    def spill():
+        fd, path = tempfile.mkstemp(prefix='paramfinder-', suffix='.db', dir=directory)
+        os.close(fd)
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode=OFF')
+        conn.execute('PRAGMA synchronous=OFF')
+        conn.execute('CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+        conn.executemany('INSERT OR IGNORE INTO seen VALUES (?)', ((digest,) for digest in seen))
+        seen.clear()
+        store.update(conn=conn, path=path)
+
+    def is_new(key):
+        digest = hashlib.blake2b(key.encode('utf-8', 'replace'), digest_size=16).digest()
+        conn = store.get('conn')
+        if conn is not None:
+            return conn.execute('INSERT OR IGNORE INTO seen VALUES (?)', (digest,)).rowcount == 1
+        if digest in seen:
+            return False
+        seen.add(digest)
+        if len(seen) > memory_limit:
+            spill()
+        return True
+
+    def close():
+        if 'conn' in store:
+            store['conn'].close()
+            os.remove(store['path'])
+
+    return is_new, close
+
+def param_extract(lines, level, black_list, placeholder, is_new=None):
+    if is_new is None:
+        is_new, _ = create_url_filter()
+    final_uris = {}
+
+    for line in lines:
+        try:
+            parts = urlsplit(line.strip())
+        except ValueError:
+            continue
+        if not parts.scheme or not parts.netloc or '=' not in parts.query:
+            continue
+        if black_list and os.path.splitext(parts.path)[1].lower() in black_list:
+            continue
+        # Work on the raw query text so values keep their original encoding in the output
+        params = [field.partition('=') for field in parts.query.split('&')]
+        params = [(name, value) for name, sep, value in params if name and sep]
+        if not params:
+            continue
+
+        key = '\n'.join((parts.netloc.lower(), parts.path, *sorted({name for name, _ in params})))
+        if not is_new(key):
+            continue
+
+        base = f"{parts.scheme}://{parts.netloc}{parts.path}?{params[0][0]}="
+        final_uris.setdefault(base + placeholder)
+        if level == 'high' and len(params) > 1:
+            final_uris.setdefault(f"{base}{params[0][1]}&{params[1][0]}={placeholder}")
+
+    return list(final_uris)
 
 def parser_arguments():
     parser = argparse.ArgumentParser(description='ParamSpider: a parameter discovery suite')
-    parser.add_argument('-d', '--domain', help='Domain name of the target [ex: hackerone.com]', required=True)
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('-d', '--domain', help='Domain name of the target [ex: hackerone.com]')
+    target.add_argument('-D', '--domains', help='File with one domain per line for batch mode (- for stdin)')
     parser.add_argument('-s', '--subs', help='Set False for no subdomains [ex: --subs False]', type=bool, default=True)
     parser.add_argument('-l', '--level', help='For nested parameters [ex: --level high]', default='low')
     parser.add_argument('-e', '--exclude', help='Extensions to exclude [ex: --exclude php,aspx]')
-    parser.add_argument('-o', '--output', help='Output file name [by default it is \'domain.txt\']')
+    parser.add_argument('-o', '--output',
+                        help='Output file name [by default it is \'domain.txt\', or \'merged.txt\' in batch mode]')
     parser.add_argument('-p', '--placeholder', help='The string to add as a placeholder after the parameter name.',
                         default="")
     parser.add_argument('-q', '--quiet', help='Do not print the results to the screen', action='store_true')
     parser.add_argument('-r', '--retries', help='Specify number of retries for 4xx and 5xx errors', type=int, default=3)
-    return parser.parse_args()
+    parser.add_argument('-t', '--threads', help='Number of CDX pages fetched concurrently per domain', type=int,
+                        default=4)
+    parser.add_argument('-w', '--workers', help='Number of domains processed concurrently in batch mode', type=int,
+                        default=4)
+    parser.add_argument('--rate', help='Global limit of archive requests per second (0 for unlimited)', type=float,
+                        default=5)
+    parser.add_argument('-S', '--sources', help=f'Comma separated URL sources [{",".join(url_sources)}]',
+                        default='wayback')
+    parser.add_argument('-i', '--input', help='File of crawled URLs to add as a source (- for stdin)')
+    parser.add_argument('--cc-indexes', help='Number of recent Common Crawl indexes to query', type=int, default=1)
+    parser.add_argument('-u', '--update', action='store_true',
+                        help='Only fetch captures newer than the last run and merge them into the existing output')
+    parser.add_argument('--disk-dedupe', metavar='DIR', nargs='?', const=tempfile.gettempdir(),
+                        help='Keep the dedupe keys in a temporary SQLite file from the start')
+    parser.add_argument('--dedupe-limit', type=int, default=DEDUPE_MEMORY_LIMIT,
+                        help='Dedupe keys kept in memory before they move to a temporary SQLite file')
+    args = parser.parse_args()
 
-def main():
-    args = parser_arguments()
+    args.sources = [name.strip().lower() for name in args.sources.split(',') if name.strip()]
+    unknown = [name for name in args.sources if name not in url_sources]
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(unknown)}")
+    if not args.sources and not args.input:
+        parser.error("no URL source selected")
+    if args.input == '-' and args.domains == '-':
+        parser.error("stdin can only be used for one of --domains and --input")
+    if args.domain:
+        args.domain = args.domain.strip().lower()
+    return args
 
-    url = f"https://web.archive.org/cdx/search/cdx?url={'*.' if args.subs else ''}{args.domain}/*&output=txt&fl=original&collapse=urlkey&page=/"
-    retries = 0
-    while retries < args.retries:
-        response, retry = connector(url)
-        if not retry:
-            break
-        retries += 1
+def find_params(session, limiter, domain, args, black_list, since=None, input_spool=None):
+    since = since or {}
+    source_stats = {}
+    iterators = []
+    for name in args.sources:
+        stats = {'pages': 0, 'failed_pages': 0, 'retries': 0}
+        source_stats[name] = stats
+        iterators.append(url_sources[name](session, limiter, domain, args, stats, since.get(name)))
+    if args.input:
+        source_stats['input'] = {'pages': 1, 'failed_pages': 0, 'retries': 0}
+        if input_spool:
+            iterators.append(iter_spooled_urls(input_spool, domain))
+        else:
+            iterators.append(iter_file_urls(args.input, domain, args.subs))
 
-    if not response:
-        print("\u001b[31;1mFailed to retrieve data after multiple retries.\u001b[0m")
-        return
+    if args.disk_dedupe:
+        is_new, close = create_url_filter(args.disk_dedupe, 0)
+    else:
+        is_new, close = create_url_filter(memory_limit=args.dedupe_limit)
+    try:
+        final_uris = param_extract(iter_merged_urls(iterators), args.level, black_list, args.placeholder, is_new)
+    finally:
+        close()
 
-    response = unquote(response)
-    black_list = [f".{ext}" for ext in args.exclude.split(",")] if args.exclude else []
+    stats = {key: sum(source[key] for source in source_stats.values()) for key in ('pages', 'failed_pages', 'retries')}
+    stats['latest'] = {name: source['latest'] for name, source in source_stats.items() if source.get('latest')}
+    return final_uris, stats
 
-    if black_list:
-        print(
-            f"\u001b[31m[!] URLs containing these extensions will be excluded from the results: {black_list}\u001b[0m\n")
+def get_state_key(domain, subs):
+    return f"{'*.' if subs else ''}{domain}"
 
-    final_uris = param_extract(response, args.level, black_list, args.placeholder)
-    save_func(final_uris, args.output, args.domain)
+def update_state(state, key, stats):
+    # Keep the old timestamps after a run with failed pages so the missed captures are fetched next time
+    if stats['failed_pages'] or not stats['latest']:
+        return False
+    entry = state.setdefault(key, {})
+    for name, timestamp in stats['latest'].items():
+        if timestamp > entry.get(name, ''):
+            entry[name] = timestamp
+    return True
 
-    if not args.quiet:
+def print_new_urls(new_urls, quiet):
+    print(f"\u001b[32m[+] New unique URLs since the last run: {len(new_urls)}\u001b[31m")
+    if not quiet and new_urls:
+        print("\u001b[32;1m")
+        print('\n'.join(f"+ {url}" for url in new_urls))
+        print("\u001b[0m")
+
+def is_failed_run(stats):
+    return stats['pages'] > 0 and stats['failed_pages'] >= stats['pages']
+
+def read_output(domain):
+    filename = os.path.join('output', f'{domain}.txt')
+    if not os.path.exists(filename):
+        return []
+    with open(filename, encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+def read_domains(path):
+    f = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        domains = {}
+        for line in f:
+            domain = line.strip().lower()
+            if domain and not domain.startswith('#'):
+                domains.setdefault(domain)
+        return list(domains)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def run_batch(args, session, limiter, black_list):
+    domains = read_domains(args.domains)
+    print(f"\u001b[32m[+] Processing {len(domains)} domains with {args.workers} workers\u001b[0m")
+    merged = {}
+    new_total = {}
+    totals = {'pages': 0, 'failed_pages': 0, 'retries': 0, 'failed_domains': 0}
+    state = load_state()
+    input_spool = spool_input_urls(args.input, domains, args.subs, args.disk_dedupe) if args.input else None
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.workers)) as executor:
+            futures = {}
+            for domain in domains:
+                since = state.get(get_state_key(domain, args.subs)) if args.update else None
+                futures[executor.submit(find_params, session, limiter, domain, args, black_list, since,
+                                        input_spool)] = domain
+            for future in as_completed(futures):
+                domain = futures[future]
+                final_uris, stats = future.result()
+                for key in ('pages', 'failed_pages', 'retries'):
+                    totals[key] += stats[key]
+                if is_failed_run(stats):
+                    totals['failed_domains'] += 1
+                    print(f"\u001b[31;1m[-] {domain}: failed to retrieve data after multiple retries, "
+                          f"keeping the previous output.\u001b[0m")
+                    merged.update(dict.fromkeys(read_output(domain)))
+                    continue
+                if args.update:
+                    final_uris, new_urls = merge_output(final_uris, None, domain)
+                    new_total.update(dict.fromkeys(new_urls))
+                else:
+                    save_func(final_uris, None, domain)
+                if update_state(state, get_state_key(domain, args.subs), stats):
+                    save_state(state)
+                merged.update(dict.fromkeys(final_uris))
+                print(f"\u001b[32m[+] {domain}: {len(final_uris)} URLs "
+                      f"{f'({len(new_urls)} new) ' if args.update else ''}"
+                      f"({stats['pages'] - stats['failed_pages']}/{stats['pages']} source pages)\u001b[0m")
+    finally:
+        if input_spool:
+            os.remove(input_spool)
+
+    final_uris = list(merged)
+    if is_failed_run(totals):
+        print("\u001b[31;1mNo source page could be fetched, the merged output was not changed.\u001b[0m")
+        return
+    save_func(final_uris, args.output, 'merged')
+    if args.update:
+        print_new_urls(list(new_total), args.quiet)
+    elif not args.quiet:
         print("\u001b[32;1m")
         print('\n'.join(final_uris))
         print("\u001b[0m")
 
-    print(f"\n\u001b[32m[+] Total number of retries:  {retries}\u001b[31m")
+    print(f"\n\u001b[32m[+] Total number of retries:  {totals['retries']}\u001b[31m")
+    print(f"\u001b[32m[+] Source pages fetched: {totals['pages'] - totals['failed_pages']}/{totals['pages']}\u001b[31m")
+    print(f"\u001b[32m[+] Domains failed: {totals['failed_domains']}/{len(domains)}\u001b[31m")
+    print(f"\u001b[32m[+] Total unique URLs found: {len(final_uris)}\u001b[31m")
+    output_path = f"output/{args.output if args.output else 'merged'}.txt"
+    print(f"\u001b[32m[+] Merged output is saved here: \u001b[31m\u001b[36m{output_path}\u001b[31m")
+
+def main():
+    args = parser_arguments()
+
+    black_list = {f".{ext.strip().lstrip('.').lower()}" for ext in args.exclude.split(",")} if args.exclude else set()
+
+    if black_list:
+        print(
+            f"\u001b[31m[!] URLs containing these extensions will be excluded from the results: {sorted(black_list)}\u001b[0m\n")
+
+    pool_size = max(1, args.threads) * max(1, len(args.sources)) * (max(1, args.workers) if args.domains else 1)
+    session = create_session(pool_size)
+    limiter = create_rate_limiter(args.rate)
+
+    if args.domains:
+        run_batch(args, session, limiter, black_list)
+        print(f"\n\u001b[31m[!] Total execution time: {int(time.time() - start_time)}s\u001b[0m")
+        return
+
+    state = load_state()
+    state_key = get_state_key(args.domain, args.subs)
+    since = state.get(state_key) if args.update else None
+    if since:
+        newest = ', '.join(f"{name} {timestamp}" for name, timestamp in sorted(since.items()))
+        print(f"\u001b[32m[+] Fetching captures newer than: {newest}\u001b[0m")
+
+    final_uris, stats = find_params(session, limiter, args.domain, args, black_list, since)
+    if is_failed_run(stats):
+        print("\u001b[31;1mFailed to retrieve data after multiple retries, the previous output was not changed.\u001b[0m")
+        return
+    if update_state(state, state_key, stats):
+        save_state(state)
+
+    if args.update:
+        final_uris, new_urls = merge_output(final_uris, args.output, args.domain)
+        print_new_urls(new_urls, args.quiet)
+    else:
+        save_func(final_uris, args.output, args.domain)
+        if not args.quiet:
+            print("\u001b[32;1m")
+            print('\n'.join(final_uris))
+            print("\u001b[0m")
+
+    print(f"\n\u001b[32m[+] Total number of retries:  {stats['retries']}\u001b[31m")
+    print(f"\u001b[32m[+] Source pages fetched: {stats['pages'] - stats['failed_pages']}/{stats['pages']}\u001b[31m")
     print(f"\u001b[32m[+] Total unique URLs found: {len(final_uris)}\u001b[31m")
     output_path = f"output/{args.output if args.output else args.domain}.txt"
     print(f"\u001b[32m[+] Output is saved here: \u001b[31m\u001b[36m{output_path}\u001b[31m")
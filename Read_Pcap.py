@@ -1,13 +1,226 @@
 import csv
 import os
+import mmap
+import socket
+import json
+import time
+import heapq
+import struct
+import threading
 import sqlite3
 import argparse
 from scapy.all import *
+from glob import glob
+from datetime import datetime, timezone
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def get_ip_counts(packets, ip_layer, ip_field):
-    ips = [packet[ip_layer].getfieldval(ip_field) for packet in packets if packet.haslayer(ip_layer)]
-    return Counter(ips)
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+pcap_formats = {
+    b'\xd4\xc3\xb2\xa1': ('<', 1e-6),
+    b'\xa1\xb2\xc3\xd4': ('>', 1e-6),
+    b'\x4d\x3c\xb2\xa1': ('<', 1e-9),
+    b'\xa1\xb2\x3c\x4d': ('>', 1e-9)
+}
+vlan_ethertypes = {0x8100, 0x88A8, 0x9100}
+non_ip_ethertypes = {0x0806, 0x8035, 0x88CC, 0x888E, 0x8808}
+ipv6_extension_headers = {0, 43, 60}
+protocol_names = {1: 'ICMP', 6: 'TCP', 17: 'UDP', 47: 'GRE', 50: 'ESP', 58: 'ICMPv6', 132: 'SCTP'}
+tcp_flag_names = [''.join(letter for bit, letter in enumerate("FSRPAUECN") if value & (1 << bit)) for value in range(512)]
+port_pair = struct.Struct('!HH')
+address_names = {}
+
+def get_address_name(address):
+    name = address_names.get(address)
+    if name is None:
+        name = socket.inet_ntop(socket.AF_INET if len(address) == 4 else socket.AF_INET6, address)
+        address_names[address] = name
+    return name
+
+def read_pcap_frames(pcap_file, start=None, end=None):
+    with open(pcap_file, 'rb') as file:
+        header = file.read(24)
+        byte_order, timestamp_scale = pcap_formats[header[:4]]
+        linktype = struct.unpack(byte_order + 'I', header[20:24])[0] & 0x0FFFFFFF
+        if os.fstat(file.fileno()).st_size <= 24:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            unpack_record_header = struct.Struct(byte_order + 'IIII').unpack_from
+            offset = start or 24
+            end = min(end or len(data), len(data))
+            while offset + 16 <= end:
+                ts_sec, ts_fraction, captured_length, original_length = unpack_record_header(data, offset)
+                offset += 16
+                yield ts_sec + ts_fraction * timestamp_scale, original_length, linktype, data[offset:offset + captured_length]
+                offset += captured_length
+
+def decode_packet(packet):
+    if packet.haslayer(IP):
+        ip = packet[IP]
+        protocol = ip.proto
+    elif packet.haslayer(IPv6):
+        ip = packet[IPv6]
+        protocol = ip.nh
+    else:
+        return None
+    if packet.haslayer(TCP):
+        return ip.src, ip.dst, 6, packet[TCP].sport, packet[TCP].dport, int(packet[TCP].flags)
+    if packet.haslayer(UDP):
+        return ip.src, ip.dst, 17, packet[UDP].sport, packet[UDP].dport, None
+    return ip.src, ip.dst, protocol, None, None, None
+
+def decode_frame(linktype, frame):
+    frame_length = len(frame)
+    if linktype == 1 and frame_length >= 14:
+        offset = 14
+        ethertype = (frame[12] << 8) | frame[13]
+        while ethertype in vlan_ethertypes and frame_length >= offset + 4:
+            ethertype = (frame[offset + 2] << 8) | frame[offset + 3]
+            offset += 4
+    elif linktype == 113 and frame_length >= 16:
+        offset = 16
+        ethertype = (frame[14] << 8) | frame[15]
+    elif linktype in (12, 14, 101) and frame_length:
+        offset = 0
+        ethertype = {4: 0x0800, 6: 0x86DD}.get(frame[0] >> 4)
+    elif linktype in (228, 229):
+        offset = 0
+        ethertype = 0x0800 if linktype == 228 else 0x86DD
+    else:
+        ethertype = None
+
+    if ethertype == 0x0800 and frame_length >= offset + 20:
+        src = get_address_name(frame[offset + 12:offset + 16])
+        dst = get_address_name(frame[offset + 16:offset + 20])
+        protocol = frame[offset + 9]
+        fragment_offset = ((frame[offset + 6] & 0x1F) << 8) | frame[offset + 7]
+        l4_offset = offset + (frame[offset] & 0x0F) * 4 if not fragment_offset else None
+    elif ethertype == 0x86DD and frame_length >= offset + 40:
+        src = get_address_name(frame[offset + 8:offset + 24])
+        dst = get_address_name(frame[offset + 24:offset + 40])
+        protocol = frame[offset + 6]
+        l4_offset = offset + 40
+        while l4_offset is not None and frame_length >= l4_offset + 8:
+            if protocol in ipv6_extension_headers:
+                protocol, l4_offset = frame[l4_offset], l4_offset + (frame[l4_offset + 1] + 1) * 8
+            elif protocol == 44:
+                fragment_offset = ((frame[l4_offset + 2] << 8) | frame[l4_offset + 3]) >> 3
+                protocol, l4_offset = frame[l4_offset], l4_offset + 8 if not fragment_offset else None
+            else:
+                break
+    elif ethertype in non_ip_ethertypes:
+        return None
+    else:
+        layer = conf.l2types.get(linktype)
+        return decode_packet(layer(bytes(frame))) if layer else None
+
+    if protocol == 6 and l4_offset is not None and frame_length >= l4_offset + 14:
+        sport, dport = port_pair.unpack_from(frame, l4_offset)
+        return src, dst, 6, sport, dport, ((frame[l4_offset + 12] & 0x01) << 8) | frame[l4_offset + 13]
+    if protocol == 17 and l4_offset is not None and frame_length >= l4_offset + 4:
+        sport, dport = port_pair.unpack_from(frame, l4_offset)
+        return src, dst, 17, sport, dport, None
+    return src, dst, protocol, None, None, None
+
+def iter_decoded_packets(pcap_file, start=None, end=None):
+    with open(pcap_file, 'rb') as file:
+        magic = file.read(4)
+    if magic in pcap_formats:
+        for timestamp, length, linktype, frame in read_pcap_frames(pcap_file, start, end):
+            yield timestamp, length, decode_frame(linktype, frame)
+        return
+    with PcapReader(pcap_file) as packets:
+        for packet in packets:
+            yield float(packet.time), packet.wirelen or len(packet), decode_packet(packet)
+
+def split_pcap(pcap_file, chunk_size):
+    with open(pcap_file, 'rb') as file:
+        header = file.read(24)
+        file_size = os.fstat(file.fileno()).st_size
+        if header[:4] not in pcap_formats or file_size <= 24 + chunk_size:
+            return [(pcap_file, None, None)]
+        unpack_captured_length = struct.Struct(pcap_formats[header[:4]][0] + 'I').unpack_from
+        chunks = []
+        start = offset = 24
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            while offset + 16 <= file_size:
+                if offset - start >= chunk_size:
+                    chunks.append((pcap_file, start, offset))
+                    start = offset
+                offset += 16 + unpack_captured_length(data, offset + 8)[0]
+        chunks.append((pcap_file, start, None))
+        return chunks
+
+def is_capture_file(path):
+    with open(path, 'rb') as file:
+        magic = file.read(4)
+    return magic in pcap_formats or magic == b'\x0a\x0d\x0d\x0a'
+
+def expand_inputs(inputs):
+    pcap_files = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            paths = sorted(os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names)
+            pcap_files.extend(path for path in paths if is_capture_file(path))
+        else:
+            pcap_files.extend(path for path in sorted(glob(pattern)) if os.path.isfile(path))
+    return list(dict.fromkeys(pcap_files))
+
+def new_results():
+    return {
+        "source_ip_counts": Counter(),
+        "destination_ip_counts": Counter(),
+        "flows": {}
+    }
+
+def merge_flows(total, flows):
+    for key, (packets, size, first_seen, last_seen, flag_counts) in flows.items():
+        flow = total.get(key)
+        if flow is None:
+            total[key] = [packets, size, first_seen, last_seen, flag_counts]
+            continue
+        flow[0] += packets
+        flow[1] += size
+        flow[2] = min(flow[2], first_seen)
+        flow[3] = max(flow[3], last_seen)
+        flow[4].update(flag_counts)
+
+def merge_results(total, results):
+    for key, counts in results.items():
+        if key == "flows":
+            merge_flows(total[key], counts)
+        else:
+            total[key].update(counts)
+    return total
+
+def update_results(results, timestamp, length, decoded):
+    src, dst, protocol, sport, dport, flags = decoded
+    results["source_ip_counts"][src] += 1
+    results["destination_ip_counts"][dst] += 1
+    key = (src, dst, protocol, sport, dport)
+    flow = results["flows"].get(key)
+    if flow is None:
+        flow = results["flows"][key] = [0, 0, timestamp, timestamp, Counter()]
+    flow[0] += 1
+    flow[1] += length
+    if timestamp < flow[2]:
+        flow[2] = timestamp
+    if timestamp > flow[3]:
+        flow[3] = timestamp
+    if flags is not None:
+        flow[4][tcp_flag_names[flags]] += 1
+
+def analyze_pcap(pcap_file, start=None, end=None):
+    results = new_results()
+    for timestamp, length, decoded in iter_decoded_packets(pcap_file, start, end):
+        if decoded is not None:
+            update_results(results, timestamp, length, decoded)
+    return results
 
 def write_to_file(filename, lines):
     with open(filename, 'w') as file:
@@ -25,68 +238,295 @@ def write_ips_to_csv(filename, ips_count):
             writer.writerow([ip, count])
     print_file_saved_message(os.path.abspath(filename))
 
-def write_ips_to_db(db_filename, ips_count):
+def get_ip_pair_counts(flows):
+    ip_pair_counts = Counter()
+    for (src, dst, _, _, _), flow in flows.items():
+        ip_pair_counts[(src, dst)] += flow[0]
+    return ip_pair_counts
+
+def write_ips_to_db(db_filename, results, batch_size=10000):
     conn = sqlite3.connect(db_filename)
     cursor = conn.cursor()
     cursor.execute('''CREATE TABLE IF NOT EXISTS ip_counts
                       (source_ip TEXT, destination_ip TEXT, count INTEGER)''')
-    for ip, count in ips_count.items():
-        cursor.execute("INSERT INTO ip_counts (source_ip, destination_ip, count) VALUES (?, ?, ?)",
-                       (ip, ip, count))
+    cursor.execute('''CREATE TABLE IF NOT EXISTS flows
+                      (source_ip TEXT, destination_ip TEXT, protocol INTEGER, source_port INTEGER,
+                       destination_port INTEGER, packets INTEGER, bytes INTEGER, first_seen REAL,
+                       last_seen REAL, tcp_flags TEXT)''')
+    cursor.executemany("INSERT INTO ip_counts (source_ip, destination_ip, count) VALUES (?, ?, ?)",
+                       ((src, dst, count) for (src, dst), count in get_ip_pair_counts(results["flows"]).items()))
+    rows = [(*key, packets, size, first_seen, last_seen, json.dumps(flag_counts) if flag_counts else None)
+            for key, (packets, size, first_seen, last_seen, flag_counts) in results["flows"].items()]
+    for index in range(0, len(rows), batch_size):
+        cursor.executemany("INSERT INTO flows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows[index:index + batch_size])
     conn.commit()
     conn.close()
     print_file_saved_message(os.path.abspath(db_filename))
 
-def get_ip_pairs(packets):
-    ip_pairs = [(packet[IP].src, packet[IP].dst) for packet in packets if packet.haslayer(IP)]
-    return ip_pairs
+def write_flows_to_parquet(filename, flows):
+    if pyarrow is None:
+        print("Parquet output requires pyarrow. Install it with: pip install pyarrow")
+        return
+    keys = list(flows)
+    values = [flows[key] for key in keys]
+    table = pyarrow.table({
+        "source_ip": [key[0] for key in keys],
+        "destination_ip": [key[1] for key in keys],
+        "protocol": pyarrow.array([key[2] for key in keys], pyarrow.uint8()),
+        "source_port": pyarrow.array([key[3] for key in keys], pyarrow.uint16()),
+        "destination_port": pyarrow.array([key[4] for key in keys], pyarrow.uint16()),
+        "packets": pyarrow.array([value[0] for value in values], pyarrow.int64()),
+        "bytes": pyarrow.array([value[1] for value in values], pyarrow.int64()),
+        "first_seen": pyarrow.array([int(value[2] * 1e6) for value in values], pyarrow.timestamp('us', tz='UTC')),
+        "last_seen": pyarrow.array([int(value[3] * 1e6) for value in values], pyarrow.timestamp('us', tz='UTC')),
+        "tcp_flags": pyarrow.array([list(value[4].items()) for value in values], pyarrow.map_(pyarrow.string(), pyarrow.int64()))
+    })
+    pyarrow.parquet.write_table(table, filename)
+    print_file_saved_message(os.path.abspath(filename))
 
-def get_ip_flags_pairs(packets):
-    ip_flags_pairs = [(packet[IP].src, packet[IP].dst, packet[TCP].sprintf("%TCP.flags%"))
-                      for packet in packets if packet.haslayer(IP) and packet.haslayer(TCP)]
-    return ip_flags_pairs
+def format_endpoint(ip, port):
+    if port is None:
+        return ip
+    return f"[{ip}]:{port}" if ':' in ip else f"{ip}:{port}"
 
-parser = argparse.ArgumentParser(description='Analyze pcap file Created by Khoilg')
-parser.add_argument('-i', '--input', help='Path to the pcap file to analyze', required=True)
-parser.add_argument('-p', '--print', action='store_true', help='Print connection of file to terminal')
-parser.add_argument('-o', '--output', help='Path to save the output files. If ".", files will be saved in the current directory')
-parser.add_argument('-t', '--type', help='Type of the output file (txt, csv or db)', choices=['txt', 'csv','db'], default='txt')
-args = parser.parse_args()
+def print_connections(flows):
+    print("Connections Tracking ")
+    for (src, dst, protocol, sport, dport), (packets, size, first_seen, last_seen, flag_counts) in flows.items():
+        flags = ' '.join(f"{name}:{count}" for name, count in flag_counts.items()) or protocol_names.get(protocol, str(protocol))
+        print(f"{format_endpoint(src, sport)} <=> [{flags}] <=> {format_endpoint(dst, dport)} "
+              f"({packets} packets, {size} bytes, {last_seen - first_seen:.3f}s)")
 
-if not any([args.output, args.type != 'txt', args.print]):
-    parser.print_help()
-    print("\nPlease select additional options.")
-    exit()
+def create_top_k(capacity):
+    return {"capacity": capacity, "counts": {}, "floor": 0}
 
-pcap_file = args.input
-if not os.path.isfile(pcap_file):
-    print(f"The file {pcap_file} does not exist. Please try again.")
-    exit()
+def add_top_k(top_k, key, weight=1):
+    entry = top_k["counts"].get(key)
+    if entry is not None:
+        entry[0] += weight
+        return
+    top_k["counts"][key] = [top_k["floor"] + weight, top_k["floor"]]
+    if len(top_k["counts"]) >= 2 * top_k["capacity"]:
+        kept = heapq.nlargest(top_k["capacity"], top_k["counts"].items(), key=lambda item: item[1][0])
+        top_k["floor"] = max(top_k["floor"], kept[-1][1][0])
+        top_k["counts"] = dict(kept)
 
-try:
-    packets = rdpcap(pcap_file)
-    ip_flags_pairs = get_ip_flags_pairs(packets)
-except Exception as e:
-    print(f"Error: {e}")
-    exit()
-
-destination_ip_counts = get_ip_counts(packets, IP, 'dst')
-source_ip_counts = get_ip_counts(packets, IP, 'src')
-
-output_terminal_lines = ["Connections Tracking \n"]
-output_terminal_lines += [f"{src} <=> [{flags}] <=> {dst}\n" for src, dst, flags in ip_flags_pairs]
-
-if args.print:
-    print(''.join(output_terminal_lines))
-elif args.output:
-    output_path = args.output if args.output != '.' else ''
-    if args.type == 'txt':
-        output_file_lines = [f"{ip}\n" for ip in destination_ip_counts.keys()]
-        output_filename = os.path.join(output_path, "ip.txt")
-        write_to_file(output_filename, output_file_lines)
-    elif args.type == 'csv':
-        output_csv_filename = os.path.join(output_path, "ip.csv")
-        write_ips_to_csv(output_csv_filename, destination_ip_counts)
-    elif args.type == 'db':
-        db_filename = os.path.join(output_path, "ip.db")
-        write_ips_to_db(db_filename, destination_ip_counts)
\ No newline at end of file
+def get_top_k(top_k, limit):
+    return heapq.nlargest(limit, ((key, count, error) for key, (count, error) in top_k["counts"].items()),
+                          key=lambda item: item[1])
+
+def create_window(window_start, top):
+    return {
+        "start": window_start,
+        "packets": 0,
+        "bytes": 0,
+        "sources": create_top_k(top * 10),
+        "destinations": create_top_k(top * 10),
+        "flows": create_top_k(top * 10)
+    }
+
+def add_to_window(window, length, decoded):
+    src, dst, protocol, sport, dport, _ = decoded
+    window["packets"] += 1
+    window["bytes"] += length
+    add_top_k(window["sources"], src)
+    add_top_k(window["destinations"], dst)
+    add_top_k(window["flows"], (src, dst, protocol, sport, dport), length)
+
+def format_flow(key):
+    src, dst, protocol, sport, dport = key
+    return f"{format_endpoint(src, sport)} > {format_endpoint(dst, dport)} {protocol_names.get(protocol, str(protocol))}"
+
+def get_window_rows(window, window_seconds, top):
+    start = datetime.fromtimestamp(window["start"], timezone.utc).isoformat()
+    end = datetime.fromtimestamp(window["start"] + window_seconds, timezone.utc).isoformat()
+    rows = [(start, end, "total_packets", "", window["packets"], 0), (start, end, "total_bytes", "", window["bytes"], 0)]
+    for kind, formatter in (("sources", str), ("destinations", str), ("flows", format_flow)):
+        rows += [(start, end, kind, formatter(key), count, error) for key, count, error in get_top_k(window[kind], top)]
+    return rows
+
+def write_window_snapshot(window, window_seconds, top, output_type, output_path):
+    rows = get_window_rows(window, window_seconds, top)
+    print(f"[{rows[0][0]}] {window['packets']} packets, {window['bytes']} bytes")
+    for _, _, kind, key, count, _ in rows[2:]:
+        if kind == "sources" and count:
+            print(f"  {key}: {count} packets")
+    if output_path is None:
+        return
+    if output_type == 'db':
+        conn = sqlite3.connect(os.path.join(output_path, "live.db"))
+        conn.execute('''CREATE TABLE IF NOT EXISTS window_snapshots
+                        (window_start TEXT, window_end TEXT, kind TEXT, key TEXT, count INTEGER, error INTEGER)''')
+        with conn:
+            conn.executemany("INSERT INTO window_snapshots VALUES (?, ?, ?, ?, ?, ?)", rows)
+        conn.close()
+    else:
+        csv_filename = os.path.join(output_path, "live.csv")
+        write_header = not os.path.exists(csv_filename)
+        with open(csv_filename, 'a', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            if write_header:
+                writer.writerow(['window_start', 'window_end', 'kind', 'key', 'count', 'error'])
+            writer.writerows(rows)
+
+def follow_pcap_frames(pcap_file, once=False, poll_interval=0.5):
+    with open(pcap_file, 'rb') as file:
+        header = file.read(24)
+        while len(header) < 24 and not once:
+            time.sleep(poll_interval)
+            header += file.read(24 - len(header))
+        if len(header) < 24 or header[:4] not in pcap_formats:
+            raise ValueError(f"{pcap_file} is not a classic pcap file (write it with tcpdump -w)")
+        byte_order, timestamp_scale = pcap_formats[header[:4]]
+        linktype = struct.unpack(byte_order + 'I', header[20:24])[0] & 0x0FFFFFFF
+        record_header = struct.Struct(byte_order + 'IIII')
+        while True:
+            position = file.tell()
+            data = file.read(16)
+            if len(data) == 16:
+                ts_sec, ts_fraction, captured_length, original_length = record_header.unpack(data)
+                frame = file.read(captured_length)
+                if len(frame) == captured_length:
+                    yield ts_sec + ts_fraction * timestamp_scale, original_length, linktype, frame
+                    continue
+            if once:
+                return
+            file.seek(position)
+            yield None
+            time.sleep(poll_interval)
+
+def watch_traffic(args):
+    window_seconds = args.window
+    output_path = (args.output if args.output != '.' else '') if args.output else None
+    lock = threading.Lock()
+    state = {"window": None, "last_packet": time.monotonic()}
+
+    def flush_window():
+        if state["window"] is not None and state["window"]["packets"]:
+            write_window_snapshot(state["window"], window_seconds, args.top, args.type, output_path)
+        state["window"] = None
+        address_names.clear()
+
+    def handle_packet(timestamp, length, decoded):
+        if decoded is None:
+            return
+        with lock:
+            window = state["window"]
+            if window is not None and timestamp >= window["start"] + window_seconds:
+                flush_window()
+                window = None
+            if window is None:
+                window = state["window"] = create_window(timestamp - timestamp % window_seconds, args.top)
+            add_to_window(window, length, decoded)
+            state["last_packet"] = time.monotonic()
+
+    def flush_idle_window():
+        with lock:
+            if time.monotonic() - state["last_packet"] >= window_seconds:
+                flush_window()
+
+    try:
+        if args.follow:
+            for record in follow_pcap_frames(args.follow, args.once):
+                if record is None:
+                    flush_idle_window()
+                    continue
+                timestamp, length, linktype, frame = record
+                handle_packet(timestamp, length, decode_frame(linktype, frame))
+        else:
+            sniffer = AsyncSniffer(iface=args.live, filter=args.filter, store=False,
+                                   prn=lambda packet: handle_packet(float(packet.time), packet.wirelen or len(packet), decode_packet(packet)))
+            sniffer.start()
+            try:
+                while True:
+                    time.sleep(1)
+                    flush_idle_window()
+            finally:
+                sniffer.stop()
+    except KeyboardInterrupt:
+        print("Stopped.")
+    except (OSError, ValueError) as e:
+        print(f"Error reading {args.follow or args.live}: {e}")
+    finally:
+        with lock:
+            flush_window()
+
+def analyze_pcaps(pcap_files, workers, chunk_size):
+    chunks = [chunk for pcap_file in pcap_files for chunk in split_pcap(pcap_file, chunk_size)]
+    total = new_results()
+    if workers <= 1 or len(chunks) == 1:
+        for pcap_file, start, end in chunks:
+            try:
+                merge_results(total, analyze_pcap(pcap_file, start, end))
+            except Exception as e:
+                print(f"Error reading {pcap_file}: {e}")
+        return total
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_pcap, *chunk): chunk[0] for chunk in chunks}
+        for future in as_completed(futures):
+            try:
+                merge_results(total, future.result())
+            except Exception as e:
+                print(f"Error reading {futures[future]}: {e}")
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze pcap file Created by Khoilg')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('-i', '--input', nargs='+', help='Pcap files, glob patterns or directories of captures to analyze')
+    source.add_argument('-l', '--live', metavar='INTERFACE', help='Sniff an interface and report rolling windows of traffic')
+    source.add_argument('-f', '--follow', metavar='PCAP', help='Follow a growing pcap file (e.g. tcpdump -U -w) and report rolling windows of traffic')
+    parser.add_argument('-p', '--print', action='store_true', help='Print connection of file to terminal')
+    parser.add_argument('-o', '--output', help='Path to save the output files. If ".", files will be saved in the current directory')
+    parser.add_argument('-t', '--type', help='Type of the output file (txt, csv, db or parquet)', choices=['txt', 'csv', 'db', 'parquet'], default='txt')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='Number of worker processes (default: number of CPUs)')
+    parser.add_argument('--chunk-size', type=int, default=256, help='Split classic pcap files into chunks of this many MB for parallel processing')
+    parser.add_argument('--window', type=int, default=60, help='Live/follow mode: window length in seconds (default: 60)')
+    parser.add_argument('--top', type=int, default=20, help='Live/follow mode: number of top talkers and flows per window (default: 20)')
+    parser.add_argument('--filter', help='Live mode: BPF filter, e.g. "tcp port 443"')
+    parser.add_argument('--once', action='store_true', help='Follow mode: stop at the end of the file instead of waiting for more packets')
+    args = parser.parse_args()
+
+    if args.live or args.follow:
+        if args.output and args.type not in ('csv', 'db'):
+            args.type = 'csv'
+        watch_traffic(args)
+        return
+
+    if not any([args.output, args.type != 'txt', args.print]):
+        parser.print_help()
+        print("\nPlease select additional options.")
+        exit()
+
+    pcap_files = expand_inputs(args.input)
+    if not pcap_files:
+        print(f"No pcap files found for {' '.join(args.input)}. Please try again.")
+        exit()
+
+    try:
+        results = analyze_pcaps(pcap_files, args.workers, args.chunk_size * 1024 * 1024)
+    except Exception as e:
+        print(f"Error: {e}")
+        exit()
+
+    destination_ip_counts = results["destination_ip_counts"]
+    source_ip_counts = results["source_ip_counts"]
+
+    if args.print:
+        print_connections(results["flows"])
+    elif args.output:
+        output_path = args.output if args.output != '.' else ''
+        if args.type == 'txt':
+            output_file_lines = [f"{ip}\n" for ip in destination_ip_counts.keys()]
+            output_filename = os.path.join(output_path, "ip.txt")
+            write_to_file(output_filename, output_file_lines)
+        elif args.type == 'csv':
+            output_csv_filename = os.path.join(output_path, "ip.csv")
+            write_ips_to_csv(output_csv_filename, destination_ip_counts)
+        elif args.type == 'db':
+            db_filename = os.path.join(output_path, "ip.db")
+            write_ips_to_db(db_filename, results)
+        elif args.type == 'parquet':
+            write_flows_to_parquet(os.path.join(output_path, "flows.parquet"), results["flows"])
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,9 @@
 import os
+import json
 import shutil
 import asyncio
 import logging
-from telethon import TelegramClient
+from telethon import TelegramClient, events, types, errors
 
 logging.basicConfig(filename='download_log.txt', level=logging.INFO, format='%(asctime)s - %(message)s')
 
@@ -19,6 +20,7 @@ os.makedirs(image_folder, exist_ok=True)
 os.makedirs(file_folder, exist_ok=True)
 
 status_file = 'download_status.txt'
+watch_state_file = 'watch_state.json'
 client = TelegramClient('session_name', api_id, api_hash)
 
 def format_size(size_in_bytes):
@@ -48,21 +50,41 @@ def save_downloaded_file(file_name):
     with open(status_file, 'a') as f:
         f.write(file_name + '\n')
 
+media_filters = {
+    "video": (types.InputMessagesFilterVideo, types.InputMessagesFilterGif, types.InputMessagesFilterRoundVideo),
+    "photo": (types.InputMessagesFilterPhotos,),
+    "document": (types.InputMessagesFilterDocument, types.InputMessagesFilterMusic, types.InputMessagesFilterVoice)
+}
+
+def get_media_type(message):
+    if isinstance(message.media, types.MessageMediaPhoto):
+        return "photo"
+    if isinstance(message.media, types.MessageMediaDocument) and message.media.document:
+        if any(isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes):
+            return "video"
+        return "document"
+    return None
+
+def get_file_name(message, media_type):
+    if media_type == "video":
+        return message.file.name or f"Video_{message.id}.mp4"
+    if media_type == "photo":
+        return message.file.name or f"Image_{message.id}.jpg"
+    return message.file.name or f"File_{message.id}"
+
 async def download_media(message, downloaded_files, semaphore, media_type):
-    if media_type == "video" and hasattr(message.media, 'video'):
-        file_name = message.file.name or f"Video_{message.id}.mp4"
+    if media_type != get_media_type(message):
+        return None
+    file_name = get_file_name(message, media_type)
+    if media_type == "video":
         file_folder_path = video_folder
         duration = get_video_duration(message.media.document.attributes) if message.media.document else "Unknown duration"
-    elif media_type == "image" and hasattr(message.media, 'photo'):
-        file_name = message.file.name or f"Image_{message.id}.jpg"
+    elif media_type == "photo":
         file_folder_path = image_folder
         duration = None
-    elif media_type == "file" and hasattr(message.media, 'document'):
-        file_name = message.file.name or f"File_{message.id}"
+    else:
         file_folder_path = file_folder
         duration = None
-    else:
-        return None
 
     if file_name in downloaded_files:
         logging.info(f"{media_type.capitalize()} {file_name} already downloaded, skipping.")
@@ -87,6 +109,7 @@ async def download_media(message, downloaded_files, semaphore, media_type):
         final_path = os.path.join(file_folder_path, file_name)
         shutil.move(temp_file_path, final_path)
         save_downloaded_file(file_name)
+        downloaded_files.add(file_name)
         print(f"\nDownload complete: {final_path}")
         logging.info(f"{media_type.capitalize()} downloaded successfully: {final_path}")
         return file_name
@@ -122,30 +145,163 @@ async def get_channel_info(channel_input):
         print(f"Error: {e}")
         return 0, 0, 0, None
 
-async def download_by_type(channel_input, media_type):
+async def download_by_type(channel_input, media_type, workers=10):
     await client.start(phone=phone_number)
     downloaded_files = get_downloaded_files()
-    semaphore = asyncio.Semaphore(10)
+    semaphore = asyncio.Semaphore(workers)
+    queue = asyncio.Queue(maxsize=workers * 2)
+    queued_files = set()
+    results = {"downloaded": 0, "skipped": 0}
+
+    async def download_worker():
+        while True:
+            message = await queue.get()
+            try:
+                if await download_media(message, downloaded_files, semaphore, media_type):
+                    results["downloaded"] += 1
+            except Exception as e:
+                logging.error(f"Error downloading {media_type} from message {message.id}: {e}")
+            finally:
+                queue.task_done()
+
+    worker_tasks = [asyncio.create_task(download_worker()) for _ in range(workers)]
     try:
-        messages = [
-            message async for message in client.iter_messages(channel_input)
-            if message.media and hasattr(message.media, media_type)
-        ]
-        tasks = [download_media(message, downloaded_files, semaphore, media_type) for message in messages]
-        results = await asyncio.gather(*tasks)
-        logging.info(f"\nDownloaded {len([r for r in results if r])} {media_type}s.")
+        for media_filter in media_filters[media_type]:
+            async for message in client.iter_messages(channel_input, filter=media_filter):
+                if get_media_type(message) != media_type:
+                    continue
+                file_name = get_file_name(message, media_type)
+                if file_name in downloaded_files or file_name in queued_files:
+                    results["skipped"] += 1
+                    continue
+                queued_files.add(file_name)
+                await queue.put(message)
+        await queue.join()
+        logging.info(f"Downloaded {results['downloaded']} {media_type}s, skipped {results['skipped']} already downloaded.")
+        print(f"\nDownloaded {results['downloaded']} {media_type}s, skipped {results['skipped']} already downloaded.")
     except Exception as e:
         logging.error(f"Error downloading {media_type}s: {e}")
         print(f"Error downloading {media_type}s: {e}")
+    finally:
+        for worker_task in worker_tasks:
+            worker_task.cancel()
+        await asyncio.gather(*worker_tasks, return_exceptions=True)
+
+def load_watch_state():
+    if os.path.exists(watch_state_file):
+        with open(watch_state_file, 'r') as f:
+            return json.load(f)
+    return {}
+
+def save_watch_state(watch_state):
+    with open(watch_state_file, 'w') as f:
+        json.dump(watch_state, f, indent=4)
+
+async def watch_channels(channel_inputs, media_types=("video", "photo", "document"), max_concurrency=5, reconnect_delay=10):
+    watch_state = load_watch_state()
+    downloaded_files = get_downloaded_files()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    queue = asyncio.Queue()
+    entities = {}
+    seen_ids = {}
+    in_flight = {}
+    failed = {}
+
+    def checkpoint(peer_id):
+        watermark = watch_state.get(str(peer_id), 0)
+        pending = in_flight[peer_id] | failed[peer_id]
+        if pending:
+            watermark = max(watermark, min(pending) - 1)
+        elif seen_ids[peer_id]:
+            watermark = max(watermark, max(seen_ids[peer_id]))
+        watch_state[str(peer_id)] = watermark
+        seen_ids[peer_id] = {message_id for message_id in seen_ids[peer_id] if message_id > watermark}
+        save_watch_state(watch_state)
+
+    def enqueue(peer_id, message):
+        if message.id <= watch_state.get(str(peer_id), 0) or message.id in seen_ids[peer_id]:
+            return
+        media_type = get_media_type(message)
+        if media_type not in media_types:
+            return
+        seen_ids[peer_id].add(message.id)
+        failed[peer_id].discard(message.id)
+        in_flight[peer_id].add(message.id)
+        queue.put_nowait((peer_id, message, media_type))
+
+    async def on_new_message(event):
+        if event.chat_id in entities:
+            enqueue(event.chat_id, event.message)
+
+    async def download_worker():
+        while True:
+            peer_id, message, media_type = await queue.get()
+            succeeded = False
+            try:
+                file_name = await download_media(message, downloaded_files, semaphore, media_type)
+                # download_media also returns None for files that are already downloaded
+                succeeded = bool(file_name) or get_file_name(message, media_type) in downloaded_files
+            except Exception as e:
+                logging.error(f"Watcher failed to download message {message.id} from {peer_id}: {e}")
+            finally:
+                in_flight[peer_id].discard(message.id)
+                if not succeeded:
+                    failed[peer_id].add(message.id)
+                    seen_ids[peer_id].discard(message.id)
+                checkpoint(peer_id)
+                queue.task_done()
+
+    workers = [asyncio.create_task(download_worker()) for _ in range(max_concurrency)]
+    try:
+        while True:
+            try:
+                await client.start(phone=phone_number)
+                if not entities:
+                    for channel_input in channel_inputs:
+                        try:
+                            entity = await client.get_entity(channel_input)
+                        except (ValueError, TypeError, errors.RPCError) as e:
+                            logging.error(f"Cannot watch {channel_input}: {e}")
+                            print(f"Cannot watch {channel_input}: {e}")
+                            continue
+                        peer_id = await client.get_peer_id(entity)
+                        entities[peer_id] = entity
+                        seen_ids[peer_id] = set()
+                        in_flight[peer_id] = set()
+                        failed[peer_id] = set()
+                        if str(peer_id) not in watch_state:
+                            latest_messages = await client.get_messages(entity, limit=1)
+                            watch_state[str(peer_id)] = latest_messages[0].id if latest_messages else 0
+                    if not entities:
+                        print("None of the channels could be resolved, stopping the watcher.")
+                        return
+                    save_watch_state(watch_state)
+                client.add_event_handler(on_new_message, events.NewMessage(chats=list(entities.values())))
+                for peer_id, entity in entities.items():
+                    async for message in client.iter_messages(entity, min_id=watch_state[str(peer_id)], reverse=True):
+                        enqueue(peer_id, message)
+                print(f"Watching {len(entities)} channels for new media. Press Ctrl+C to stop.")
+                await client.run_until_disconnected()
+            except (ConnectionError, OSError) as e:
+                logging.error(f"Watcher connection error: {e}")
+            finally:
+                client.remove_event_handler(on_new_message)
+            print(f"Disconnected, reconnecting in {reconnect_delay}s...")
+            await asyncio.sleep(reconnect_delay)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
 
 async def main():
     while True:
         print("Select download method:")
         print("1. Download by channel name")
         print("2. Download by invite link")
-        print("3. Exit")
+        print("3. Watch channels for new media")
+        print("4. Exit")
 
-        choice = input("Enter your choice (1, 2, or 3): ")
+        choice = input("Enter your choice (1, 2, 3, or 4): ")
 
         if choice in ["1", "2"]:
             if choice == "1":
@@ -183,6 +339,12 @@ async def main():
                         continue
                     await download_by_type(channel_input, media_type)
         elif choice == "3":
+            channel_inputs = [channel.strip() for channel in input("Enter channel names or links to watch (comma separated): ").split(",") if channel.strip()]
+            try:
+                await watch_channels(channel_inputs)
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                print("\nStopped watching.")
+        elif choice == "4":
             print("Exiting the program.")
             break
         else:
@@ -1,17 +1,34 @@
 import os
+import re
+import sys
 import shutil
 import json
+import errno
 import asyncio
+import contextlib
+import argparse
+import time
+import hashlib
 import logging
+import sqlite3
+import zipfile
+import ipaddress
+import subprocess
 from rich.text import Text
 from textwrap import shorten
 from rich.panel import Panel
 from rich.table import Table
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from rich.console import Console
 from rich.prompt import Prompt, IntPrompt
-from telethon import TelegramClient, types
-from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn, TaskProgressColumn
+from telethon import TelegramClient, types, errors, events, functions
+from concurrent.futures import ProcessPoolExecutor
+from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn, DownloadColumn, TransferSpeedColumn
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
 
 # https://my.telegram.org/auth
 
@@ -27,6 +44,12 @@ log_file = os.path.join(main_folder, 'download_log.txt')
 session_file = os.path.join(main_folder, 'session_name.session')
 config_file = os.path.join(main_folder, 'config.json')
 accounts_file = os.path.join(main_folder, 'accounts.json')
+index_file = os.path.join(main_folder, 'media_index.db')
+member_count_file = os.path.join(main_folder, 'member_counts.json')
+watch_state_file = os.path.join(main_folder, 'watch_state.json')
+catalog_file = os.path.join(main_folder, 'catalog.db')
+thumbnail_folder = os.path.join(main_folder, 'thumbnails')
+scheduler_file = os.path.join(main_folder, 'scheduler.json')
 
 os.makedirs(video_folder, exist_ok=True)
 os.makedirs(image_folder, exist_ok=True)
@@ -37,6 +60,33 @@ console = Console()
 
 accounts = []
 current_account_index = 0
+reserved_file_paths = set()
+post_processor = {}
+download_scheduler = {}
+
+scheduler_defaults = {
+    "max_bytes_per_second": 0,
+    "max_in_flight_bytes": 0,
+    "min_free_bytes": 1024 ** 3,
+    "order": "date"
+}
+queue_orders = {
+    "date": "Newest first",
+    "oldest": "Oldest first",
+    "smallest": "Smallest first",
+    "largest": "Largest first"
+}
+
+ioc_patterns = {
+    "url": re.compile(rb'https?://[^\s"\'<>()\[\]{}\\]+'),
+    "ipv4": re.compile(rb'\b(?:\d{1,3}\.){3}\d{1,3}\b'),
+    "sha256": re.compile(rb'\b[a-fA-F0-9]{64}\b'),
+    "sha1": re.compile(rb'\b[a-fA-F0-9]{40}\b'),
+    "md5": re.compile(rb'\b[a-fA-F0-9]{32}\b')
+}
+ioc_extensions = {'.txt', '.csv', '.json', '.xml', '.html', '.htm', '.log', '.md', '.eml', '.ioc', '.yar', '.yara', '.rules',
+                  '.js', '.ps1', '.bat', '.sh', '.py', '.ini', '.cfg', '.conf', '.rtf', '.pdf', '.docx', '.xlsx', '.pptx'}
+office_extensions = {'.docx', '.xlsx', '.pptx'}
 
 def add_account(api_id, api_hash, phone_number):
     session_file = os.path.join(main_folder, f"session_{phone_number}.session")
@@ -165,6 +215,9 @@ def save_config(api_id, api_hash, phone_number):
 def get_api_config():
     config = load_config()
     if not config.get("api_id") or not config.get("api_hash") or not config.get("phone_number"):
+        if not sys.stdin.isatty():
+            console.print(f"[red]No API credentials found in {config_file}. Run the interactive menu once to set them up.[/red]")
+            sys.exit(2)
 
         console.print("[bold blue]Please provide your Telegram API credentials.[/bold blue]")
         console.print("[yellow]You can obtain these credentials from the Telegram website:[/yellow] [underline]https://my.telegram.org/auth[/underline]")
@@ -239,6 +292,36 @@ def update_api_credentials():
     save_config(api_id, api_hash, phone_number)
     console.print("[green]API credentials updated successfully.[/green]")
 
+def manage_download_settings():
+    settings = load_scheduler_settings()
+    while True:
+        console.print(Panel.fit(
+            Text("Download Settings", style="bold blue"),
+            border_style="green"
+        ))
+        rate = settings["max_bytes_per_second"]
+        in_flight = settings["max_in_flight_bytes"]
+        console.print(f"[1] Bandwidth cap: {format_size(rate) + '/s' if rate else 'Unlimited'}")
+        console.print(f"[2] Max in-flight bytes: {format_size(in_flight) if in_flight else 'Unlimited'}")
+        console.print(f"[3] Minimum free disk space: {format_size(settings['min_free_bytes'])}")
+        console.print(f"[4] Queue order: {queue_orders[settings['order']]}")
+        console.print("[5] Back to main menu")
+        choice = IntPrompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5"])
+
+        if choice == 1:
+            settings["max_bytes_per_second"] = int(float(Prompt.ask("Enter the bandwidth cap in MB/s (0 for unlimited)")) * 1024 ** 2)
+        elif choice == 2:
+            settings["max_in_flight_bytes"] = int(float(Prompt.ask("Enter the max in-flight size in GB (0 for unlimited)")) * 1024 ** 3)
+        elif choice == 3:
+            settings["min_free_bytes"] = int(float(Prompt.ask("Enter the minimum free disk space in GB")) * 1024 ** 3)
+        elif choice == 4:
+            settings["order"] = Prompt.ask("Enter the queue order", choices=list(queue_orders), default=settings["order"])
+        elif choice == 5:
+            break
+        save_scheduler_settings(settings)
+        configure_download_scheduler(settings)
+        console.print("[green]Download settings saved.[/green]")
+
 def format_size(size_in_bytes):
     if size_in_bytes < 1024:
         return f"{size_in_bytes} B"
@@ -266,7 +349,292 @@ def save_downloaded_file(file_name):
     with open(status_file, 'a') as f:
         f.write(file_name + '\n')
 
-async def download_media(message, downloaded_files, semaphore, media_type, progress, task_id, retries=3):
+def get_message_key(message):
+    return f"{message.chat_id}/{message.id}"
+
+def process_downloaded_file(file_path, media_type, thumbnail_path, chunk_size=1024 * 1024, scan_limit=64 * 1024 * 1024):
+    md5, sha1, sha256 = hashlib.md5(), hashlib.sha1(), hashlib.sha256()
+    extension = os.path.splitext(file_path)[1].lower()
+    scan_iocs = media_type == "document" and extension in ioc_extensions
+    found_iocs = set()
+    tail = b""
+    scanned = 0
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(chunk_size):
+            md5.update(chunk)
+            sha1.update(chunk)
+            sha256.update(chunk)
+            if scan_iocs and scanned < scan_limit:
+                found_iocs.update(extract_iocs(tail + chunk))
+                tail = chunk[-4096:]
+                scanned += len(chunk)
+    if scan_iocs and extension in office_extensions and zipfile.is_zipfile(file_path):
+        with zipfile.ZipFile(file_path) as archive:
+            for member in archive.infolist():
+                if member.filename.endswith(('.xml', '.rels', '.txt')) and member.file_size < scan_limit:
+                    found_iocs.update(extract_iocs(archive.read(member)))
+
+    thumbnail = None
+    try:
+        if media_type == "photo" and Image:
+            with Image.open(file_path) as image:
+                image.thumbnail((320, 320))
+                image.convert("RGB").save(thumbnail_path, "JPEG")
+            thumbnail = thumbnail_path
+        elif media_type == "video" and shutil.which("ffmpeg"):
+            subprocess.run(["ffmpeg", "-y", "-loglevel", "error", "-ss", "1", "-i", file_path, "-frames:v", "1",
+                            "-vf", "scale=320:-2", thumbnail_path], check=True, timeout=120)
+            thumbnail = thumbnail_path
+    except Exception as e:
+        logging.error(f"Error creating thumbnail for {file_path}: {e}")
+
+    return {
+        "path": file_path,
+        "media_type": media_type,
+        "size": os.path.getsize(file_path),
+        "md5": md5.hexdigest(),
+        "sha1": sha1.hexdigest(),
+        "sha256": sha256.hexdigest(),
+        "thumbnail": thumbnail,
+        "iocs": sorted(found_iocs)
+    }
+
+def extract_iocs(data):
+    iocs = set()
+    for ioc_type, pattern in ioc_patterns.items():
+        for match in pattern.findall(data):
+            value = match.decode('latin-1')
+            if ioc_type == "ipv4":
+                try:
+                    ipaddress.IPv4Address(value)
+                except ValueError:
+                    continue
+            elif ioc_type != "url":
+                value = value.lower()
+            iocs.add((ioc_type, value))
+    return iocs
+
+def open_catalog():
+    conn = sqlite3.connect(catalog_file)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS files (
+            path TEXT PRIMARY KEY,
+            media_type TEXT,
+            size INTEGER,
+            md5 TEXT,
+            sha1 TEXT,
+            sha256 TEXT,
+            thumbnail TEXT,
+            processed_at TEXT
+        );
+        CREATE TABLE IF NOT EXISTS iocs (
+            path TEXT,
+            type TEXT,
+            value TEXT,
+            PRIMARY KEY (path, type, value)
+        );
+        CREATE INDEX IF NOT EXISTS idx_files_sha256 ON files (sha256);
+        CREATE INDEX IF NOT EXISTS idx_files_md5 ON files (md5);
+        CREATE INDEX IF NOT EXISTS idx_iocs_value ON iocs (value);
+    ''')
+    return conn
+
+def start_post_processing(max_workers=None):
+    os.makedirs(thumbnail_folder, exist_ok=True)
+    post_processor["executor"] = ProcessPoolExecutor(max_workers=max_workers)
+    post_processor["conn"] = open_catalog()
+    post_processor["pending"] = set()
+
+def schedule_post_processing(file_path, media_type):
+    if not post_processor:
+        return
+    thumbnail_path = os.path.join(thumbnail_folder, f"{os.path.splitext(os.path.basename(file_path))[0]}_{int(time.time() * 1000)}.jpg")
+    future = asyncio.get_running_loop().run_in_executor(
+        post_processor["executor"], process_downloaded_file, file_path, media_type, thumbnail_path)
+    post_processor["pending"].add(future)
+    future.add_done_callback(save_catalog_entry)
+
+def save_catalog_entry(future):
+    post_processor["pending"].discard(future)
+    try:
+        result = future.result()
+    except Exception as e:
+        logging.error(f"Error post-processing downloaded file: {e}")
+        return
+    conn = post_processor["conn"]
+    duplicate = conn.execute("SELECT path FROM files WHERE sha256 = ? AND path != ?", (result["sha256"], result["path"])).fetchone()
+    if duplicate:
+        logging.info(f"Duplicate download: {result['path']} has the same SHA256 as {duplicate[0]}")
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO files (path, media_type, size, md5, sha1, sha256, thumbnail, processed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (result["path"], result["media_type"], result["size"], result["md5"], result["sha1"], result["sha256"],
+             result["thumbnail"], datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        conn.executemany("INSERT OR IGNORE INTO iocs (path, type, value) VALUES (?, ?, ?)",
+                         [(result["path"], ioc_type, value) for ioc_type, value in result["iocs"]])
+
+async def stop_post_processing():
+    if not post_processor:
+        return
+    if post_processor["pending"]:
+        console.print(f"[yellow]Waiting for {len(post_processor['pending'])} files to finish post-processing...[/yellow]")
+        await asyncio.gather(*post_processor["pending"], return_exceptions=True)
+        await asyncio.sleep(0)
+    post_processor["executor"].shutdown()
+    post_processor["conn"].close()
+    post_processor.clear()
+
+async def with_post_processing(coroutine, enabled):
+    if enabled:
+        start_post_processing()
+    try:
+        return await coroutine
+    finally:
+        await stop_post_processing()
+
+def create_bandwidth_limiter(bytes_per_second):
+    return {"rate": bytes_per_second, "allowance": float(bytes_per_second), "last_check": time.monotonic(), "lock": asyncio.Lock()}
+
+async def throttle_bandwidth(limiter, size):
+    if not limiter or not limiter["rate"]:
+        return
+    async with limiter["lock"]:
+        now = time.monotonic()
+        limiter["allowance"] = min(limiter["rate"], limiter["allowance"] + (now - limiter["last_check"]) * limiter["rate"])
+        limiter["last_check"] = now
+        limiter["allowance"] -= size
+        if limiter["allowance"] < 0:
+            await asyncio.sleep(-limiter["allowance"] / limiter["rate"])
+
+def load_scheduler_settings():
+    settings = dict(scheduler_defaults)
+    if os.path.exists(scheduler_file):
+        with open(scheduler_file, 'r') as file:
+            settings.update(json.load(file))
+    return settings
+
+def save_scheduler_settings(settings):
+    with open(scheduler_file, 'w') as file:
+        json.dump(settings, file, indent=4)
+
+def configure_download_scheduler(settings):
+    if settings.get("order", "date") not in queue_orders:
+        raise ValueError(f"Invalid queue order: {settings['order']}")
+    download_scheduler.update({
+        "settings": settings,
+        "limiter": create_bandwidth_limiter(int(settings.get("max_bytes_per_second", 0))),
+        "max_in_flight_bytes": int(settings.get("max_in_flight_bytes", 0)),
+        "min_free_bytes": int(settings.get("min_free_bytes", 0)),
+        "order": settings.get("order", "date"),
+        "in_flight_bytes": 0,
+        "condition": asyncio.Condition()
+    })
+
+async def reserve_download(folder_path, file_size):
+    condition = download_scheduler["condition"]
+    async with condition:
+        await condition.wait_for(lambda: not download_scheduler["in_flight_bytes"]
+                                 or not download_scheduler["max_in_flight_bytes"]
+                                 or download_scheduler["in_flight_bytes"] + file_size <= download_scheduler["max_in_flight_bytes"])
+        free_bytes = shutil.disk_usage(folder_path).free - download_scheduler["in_flight_bytes"] - download_scheduler["min_free_bytes"]
+        if file_size > free_bytes:
+            return False
+        download_scheduler["in_flight_bytes"] += file_size
+        return True
+
+async def release_download(file_size):
+    condition = download_scheduler["condition"]
+    async with condition:
+        download_scheduler["in_flight_bytes"] -= file_size
+        condition.notify_all()
+
+def order_messages(messages):
+    order = download_scheduler["order"]
+    if order == "oldest":
+        return sorted(messages, key=lambda message: message.date)
+    if order in ("smallest", "largest"):
+        return sorted(messages, key=lambda message: (message.file.size or 0) if message.file else 0, reverse=order == "largest")
+    return messages
+
+def create_download_progress():
+    return Progress(
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        DownloadColumn(),
+        TransferSpeedColumn(),
+        TimeRemainingColumn(),
+        console=console,
+        auto_refresh=False
+    )
+
+def start_progress_tracker(progress, total_files, total_bytes, description, refresh_interval=0.25):
+    tracker = {
+        "progress": progress,
+        "description": description,
+        "overall_task": progress.add_task(description, total=total_bytes),
+        "total_files": total_files,
+        "total_bytes": total_bytes,
+        "finished_files": 0,
+        "finished_bytes": 0,
+        "active": {}
+    }
+    tracker["refresher"] = asyncio.create_task(refresh_progress_tracker(tracker, refresh_interval))
+    return tracker
+
+def track_file_started(tracker, file_name, file_size):
+    task_id = tracker["progress"].add_task(f"[cyan]{shorten(file_name, width=40, placeholder='...')}", total=file_size)
+    tracker["active"][task_id] = 0
+    return task_id
+
+def track_file_finished(tracker, task_id, file_size, success, count=True):
+    tracker["active"].pop(task_id, None)
+    tracker["progress"].remove_task(task_id)
+    if count:
+        count_file_finished(tracker, file_size, success)
+
+def count_file_finished(tracker, file_size, success):
+    tracker["finished_files"] += 1
+    if success:
+        tracker["finished_bytes"] += file_size
+    else:
+        tracker["total_bytes"] -= file_size
+
+def render_progress_tracker(tracker):
+    progress = tracker["progress"]
+    for task_id, current in tracker["active"].items():
+        progress.update(task_id, completed=current)
+    progress.update(
+        tracker["overall_task"],
+        total=tracker["total_bytes"],
+        completed=tracker["finished_bytes"] + sum(tracker["active"].values()),
+        description=f"{tracker['description']} ({tracker['finished_files']}/{tracker['total_files']} files)"
+    )
+    progress.refresh()
+
+async def refresh_progress_tracker(tracker, refresh_interval):
+    while True:
+        render_progress_tracker(tracker)
+        await asyncio.sleep(refresh_interval)
+
+async def stop_progress_tracker(tracker):
+    tracker["refresher"].cancel()
+    await asyncio.gather(tracker["refresher"], return_exceptions=True)
+    render_progress_tracker(tracker)
+
+async def download_all(messages, downloaded_files, semaphore, media_type, tracker, workers=20):
+    message_iterator = iter(messages)
+
+    async def worker():
+        success_count = 0
+        for message in message_iterator:
+            if await download_media(message, downloaded_files, semaphore, media_type, tracker):
+                success_count += 1
+        return success_count
+
+    return sum(await asyncio.gather(*(worker() for _ in range(workers))))
+
+async def download_media(message, downloaded_files, semaphore, media_type, tracker=None, retries=3, telegram_client=None, wait_on_flood=True, output_root=None, raise_on_no_space=False, count_failure=True):
     if media_type == "video" and isinstance(message.media, types.MessageMediaDocument):
         file_name = message.file.name or f"Video_{message.id}.mp4"
         file_folder_path = video_folder
@@ -282,46 +650,266 @@ async def download_media(message, downloaded_files, semaphore, media_type, progr
     else:
         return None
 
+    if output_root:
+        file_folder_path = os.path.join(output_root, os.path.basename(file_folder_path))
+        os.makedirs(file_folder_path, exist_ok=True)
     file_name = get_unique_filename(file_folder_path, file_name)
-    file_size = message.file.size if message.file else 0
+    final_path = os.path.join(file_folder_path, file_name)
+    file_size = (message.file.size or 0) if message.file else 0
     file_size_str = format_size(file_size)
     temp_file_path = os.path.join(file_folder_path, f"tmp_{file_name}")
-    console.print(f"[green]Starting download: {file_name} | Size: {file_size_str} | {'Duration: ' + duration if duration else ''}[/green]")
+    if tracker:
+        task_id = track_file_started(tracker, file_name, file_size)
+    else:
+        console.print(f"[green]Starting download: {file_name} | Size: {file_size_str} | {'Duration: ' + duration if duration else ''}[/green]")
 
-    def progress_callback(current, total):
-        progress.update(task_id, completed=current, description=f"[cyan]Downloading {file_name} ({format_size(current)}/{file_size_str})...[/cyan]")
+    received_bytes = 0
+    success = False
+    reserved = False
 
-    for attempt in range(retries):
-        try:
-            async with semaphore:
-                await client.download_media(
-                    message.media,
-                    file=temp_file_path,
-                    progress_callback=progress_callback
-                )
-            final_path = os.path.join(file_folder_path, file_name)
-            shutil.move(temp_file_path, final_path)
-            save_downloaded_file(file_name)
-            console.print(f"[green]Download complete: {final_path}[/green]")
-            logging.info(f"{media_type.capitalize()} downloaded successfully: {final_path}")
-            return file_name
-        except Exception as e:
-            logging.error(f"Attempt {attempt + 1} failed: Error downloading {media_type} {file_name}: {e}")
-            console.print(f"[red]Attempt {attempt + 1} failed: Error downloading {file_name}.[/red]")
-            if os.path.exists(temp_file_path):
-                os.remove(temp_file_path)
-            if attempt == retries - 1:
-                console.print(f"[red]Failed to download {file_name} after {retries} attempts.[/red]")
-                return None
+    async def progress_callback(current, total):
+        nonlocal received_bytes
+        if tracker:
+            tracker["active"][task_id] = current
+        await throttle_bandwidth(download_scheduler["limiter"], current - received_bytes)
+        received_bytes = current
+
+    try:
+        reserved = await reserve_download(file_folder_path, file_size)
+        if not reserved:
+            logging.error(f"Not enough disk space for {media_type} {file_name} ({file_size_str}), skipping")
+            console.print(f"[red]Not enough disk space for {file_name} ({file_size_str}), skipping.[/red]")
+            if raise_on_no_space:
+                raise OSError(errno.ENOSPC, "Not enough disk space", final_path)
+            return None
+        for attempt in range(retries):
+            try:
+                received_bytes = 0
+                async with semaphore or contextlib.nullcontext():
+                    await (telegram_client or client).download_media(
+                        message.media,
+                        file=temp_file_path,
+                        progress_callback=progress_callback
+                    )
+                shutil.move(temp_file_path, final_path)
+                save_downloaded_file(file_name)
+                save_downloaded_file(get_message_key(message))
+                schedule_post_processing(final_path, media_type)
+                if not tracker:
+                    console.print(f"[green]Download complete: {final_path}[/green]")
+                logging.info(f"{media_type.capitalize()} downloaded successfully: {final_path}")
+                success = True
+                return file_name
+            except errors.FloodWaitError as e:
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+                if not wait_on_flood:
+                    raise
+                logging.warning(f"Attempt {attempt + 1} hit FLOOD_WAIT of {e.seconds}s downloading {media_type} {file_name}")
+                console.print(f"[yellow]Flood wait of {e.seconds}s before retrying {file_name}.[/yellow]")
+                await asyncio.sleep(e.seconds)
+            except Exception as e:
+                logging.error(f"Attempt {attempt + 1} failed: Error downloading {media_type} {file_name}: {e}")
+                console.print(f"[red]Attempt {attempt + 1} failed: Error downloading {file_name}.[/red]")
+                if os.path.exists(temp_file_path):
+                    os.remove(temp_file_path)
+                if isinstance(e, OSError) and e.errno == errno.ENOSPC:
+                    console.print(f"[red]Disk full while downloading {file_name}, not retrying.[/red]")
+                    if raise_on_no_space:
+                        raise
+                    return None
+        console.print(f"[red]Failed to download {file_name} after {retries} attempts.[/red]")
+        return None
+    finally:
+        reserved_file_paths.discard(final_path)
+        if reserved:
+            await release_download(file_size)
+        if tracker:
+            track_file_finished(tracker, task_id, file_size, success, count=success or count_failure)
 
 def get_unique_filename(file_folder_path, file_name):
     base_name, extension = os.path.splitext(file_name)
     counter = 1
-    while os.path.exists(os.path.join(file_folder_path, file_name)):
+    while os.path.exists(os.path.join(file_folder_path, file_name)) or os.path.join(file_folder_path, file_name) in reserved_file_paths:
         file_name = f"{base_name}_{counter}{extension}"
         counter += 1
+    reserved_file_paths.add(os.path.join(file_folder_path, file_name))
     return file_name
 
+# Telegram splits GIFs, round videos, music and voice notes out of the video/document filters,
+# so each media type is the union of several search filters
+media_filters = {
+    "photo": (types.InputMessagesFilterPhotos,),
+    "video": (types.InputMessagesFilterVideo, types.InputMessagesFilterGif, types.InputMessagesFilterRoundVideo),
+    "document": (types.InputMessagesFilterDocument, types.InputMessagesFilterMusic, types.InputMessagesFilterVoice)
+}
+
+def get_media_type(message):
+    if isinstance(message.media, types.MessageMediaPhoto):
+        return "photo"
+    if isinstance(message.media, types.MessageMediaDocument) and message.media.document:
+        if any(isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes):
+            return "video"
+        return "document"
+    return None
+
+def get_media_row(message):
+    media_type = get_media_type(message)
+    duration = None
+    resolution = None
+    if media_type == "photo":
+        for size in getattr(message.media.photo, "sizes", []):
+            if hasattr(size, "w") and hasattr(size, "h"):
+                resolution = f"{size.w}x{size.h}"
+                break
+    elif media_type == "video":
+        for attr in message.media.document.attributes:
+            if isinstance(attr, types.DocumentAttributeVideo):
+                duration = int(attr.duration)
+                resolution = f"{attr.w}x{attr.h}"
+                break
+    return (
+        message.id,
+        message.date.strftime("%Y-%m-%d %H:%M:%S"),
+        media_type,
+        message.file.name if message.file else None,
+        message.file.size if message.file else None,
+        duration,
+        resolution
+    )
+
+def open_media_index():
+    conn = sqlite3.connect(index_file)
+    conn.executescript('''
+        CREATE TABLE IF NOT EXISTS channels (
+            channel_id INTEGER PRIMARY KEY,
+            title TEXT,
+            last_message_id INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS media (
+            channel_id INTEGER,
+            message_id INTEGER,
+            date TEXT,
+            type TEXT,
+            name TEXT,
+            size INTEGER,
+            duration INTEGER,
+            resolution TEXT,
+            PRIMARY KEY (channel_id, message_id)
+        );
+        CREATE TABLE IF NOT EXISTS channel_filters (
+            channel_id INTEGER,
+            filter TEXT,
+            last_message_id INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (channel_id, filter)
+        );
+        CREATE INDEX IF NOT EXISTS idx_media_date ON media (channel_id, date);
+        CREATE INDEX IF NOT EXISTS idx_media_size ON media (channel_id, size);
+        CREATE INDEX IF NOT EXISTS idx_media_type ON media (channel_id, type, date);
+    ''')
+    return conn
+
+def save_media_batch(conn, channel, batch):
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO media (channel_id, message_id, date, type, name, size, duration, resolution) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [(channel.id, *row) for row in batch])
+
+async def sync_media_index(channel, batch_size=500):
+    conn = open_media_index()
+    try:
+        # Each filter keeps its own watermark so a filter added later is backfilled from the start
+        watermarks = dict(conn.execute(
+            "SELECT filter, last_message_id FROM channel_filters WHERE channel_id = ?", (channel.id,)).fetchall())
+        newest_message_id = max(watermarks.values(), default=0)
+        new_count = 0
+        for media_filter in {media_filter for filters in media_filters.values() for media_filter in filters}:
+            filter_name = media_filter.__name__
+            last_message_id = watermarks.get(filter_name, 0)
+            filter_newest_id = last_message_id
+            batch = []
+            async for message in client.iter_messages(channel, min_id=last_message_id, filter=media_filter):
+                filter_newest_id = max(filter_newest_id, message.id)
+                if get_media_type(message):
+                    batch.append(get_media_row(message))
+                if len(batch) >= batch_size:
+                    save_media_batch(conn, channel, batch)
+                    new_count += len(batch)
+                    batch = []
+            save_media_batch(conn, channel, batch)
+            new_count += len(batch)
+            newest_message_id = max(newest_message_id, filter_newest_id)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO channel_filters (channel_id, filter, last_message_id) VALUES (?, ?, ?)",
+                    (channel.id, filter_name, filter_newest_id))
+        with conn:
+            conn.execute(
+                "INSERT INTO channels (channel_id, title, last_message_id) VALUES (?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET title = excluded.title, last_message_id = excluded.last_message_id",
+                (channel.id, getattr(channel, "title", "Unknown"), newest_message_id))
+        if new_count:
+            logging.info(f"Indexed {new_count} new media messages for channel {channel.id}")
+        return new_count
+    finally:
+        conn.close()
+
+def is_channel_indexed(channel):
+    conn = open_media_index()
+    try:
+        return conn.execute("SELECT 1 FROM channels WHERE channel_id = ?", (channel.id,)).fetchone() is not None
+    finally:
+        conn.close()
+
+def query_media_index(channel, where="", params=(), order_by="date"):
+    conn = open_media_index()
+    try:
+        return conn.execute(
+            f"SELECT message_id, date, type, name, size, duration, resolution FROM media "
+            f"WHERE channel_id = ?{where} ORDER BY {order_by}", (channel.id, *params)).fetchall()
+    finally:
+        conn.close()
+
+def get_date_filter(start_date=None, end_date=None):
+    if not start_date:
+        return "", ()
+    start_date_obj = datetime.strptime(start_date, "%d/%m/%Y")
+    end_date_obj = datetime.strptime(end_date, "%d/%m/%Y") if end_date else start_date_obj
+    end_date_obj += timedelta(days=1)
+    return " AND date >= ? AND date < ?", (start_date_obj.strftime("%Y-%m-%d"), end_date_obj.strftime("%Y-%m-%d"))
+
+def get_file_info(row):
+    message_id, _, media_type, name, size, duration, resolution = row
+    return {
+        "type": {"photo": "Image", "video": "Video"}.get(media_type, "File"),
+        "name": name or f"File_{message_id}",
+        "size": format_size(size) if size is not None else "Unknown size",
+        "extension": os.path.splitext(name)[1].lower() if name else "Unknown",
+        "resolution": resolution,
+        "duration": f"{duration // 60}m {duration % 60}s" if duration is not None else None
+    }
+
+
+async def iter_media_messages(entity, media_type, start_date=None, end_date=None, search=None):
+    start_date_obj = None
+    offset_date = None
+    if start_date and end_date:
+        start_date_obj = datetime.strptime(start_date, "%d/%m/%Y").replace(tzinfo=timezone.utc)
+        offset_date = datetime.strptime(end_date, "%d/%m/%Y").replace(tzinfo=timezone.utc) + timedelta(days=1)
+    for media_filter in media_filters.get(media_type, (None,)):
+        async for message in client.iter_messages(entity, filter=media_filter, offset_date=offset_date, search=search):
+            if start_date_obj and message.date < start_date_obj:
+                break
+            if get_media_type(message) == media_type:
+                yield message
+
+async def iter_scheduled_messages(entity, media_type, start_date=None, end_date=None):
+    if download_scheduler["order"] == "date":
+        async for message in iter_media_messages(entity, media_type, start_date, end_date):
+            yield message
+        return
+    for message in order_messages([message async for message in iter_media_messages(entity, media_type, start_date, end_date)]):
+        yield message
 
 async def download_by_type(channel_input, media_type, start_date=None, end_date=None):
     if not client.is_connected():
@@ -333,51 +921,20 @@ async def download_by_type(channel_input, media_type, start_date=None, end_date=
     semaphore = asyncio.Semaphore(20)
     success_count = 0
     try:
-        messages = [
-            message async for message in client.iter_messages(channel_input)
-            if message.media and (
-                    (media_type == "photo" and isinstance(message.media, types.MessageMediaPhoto)) or
-                    (media_type == "video" and isinstance(message.media, types.MessageMediaDocument) and
-                     any(isinstance(attr, types.DocumentAttributeVideo) for attr in
-                         message.media.document.attributes)) or
-                    (media_type == "document" and isinstance(message.media, types.MessageMediaDocument) and
-                     not any(
-                         isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes))
-            )
-        ]
-        if start_date and end_date:
-            start_date_obj = datetime.strptime(start_date, "%d/%m/%Y")
-            end_date_obj = datetime.strptime(end_date, "%d/%m/%Y")
-            messages = [
-                message for message in messages
-                if start_date_obj <= message.date.replace(tzinfo=None) <= end_date_obj
-            ]
+        messages = order_messages([message async for message in iter_media_messages(channel_input, media_type, start_date, end_date)])
 
         total_files = len(messages)
         if total_files == 0:
             console.print(f"[yellow]No {media_type}s found to download.[/yellow]")
             return
 
-        with Progress(
-                TextColumn("[progress.description]{task.description}"),
-                BarColumn(),
-                TaskProgressColumn(),
-                TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                TimeRemainingColumn(),
-                console=console
-        ) as progress:
-            overall_task = progress.add_task(f"[green]Downloading {total_files} {media_type}s...", total=total_files)
-            file_tasks = {}
-            for message in messages:
-                file_name = message.file.name or f"{media_type}_{message.id}"
-                file_tasks[message.id] = progress.add_task(f"[cyan]{file_name}", total=message.file.size)
-
-            for message in messages:
-                file_name = await download_media(message, downloaded_files, semaphore, media_type, progress,
-                                                 file_tasks[message.id])
-                if file_name:
-                    success_count += 1
-                    progress.update(overall_task, advance=1)
+        total_bytes = sum(message.file.size or 0 for message in messages)
+        with create_download_progress() as progress:
+            tracker = start_progress_tracker(progress, total_files, total_bytes, f"[green]Downloading {media_type}s")
+            try:
+                success_count = await download_all(messages, downloaded_files, semaphore, media_type, tracker)
+            finally:
+                await stop_progress_tracker(tracker)
 
         console.print(f"[green]Downloaded {success_count} {media_type}s out of {total_files}.[/green]")
 
@@ -403,7 +960,9 @@ def display_main_menu():
         ("4", "List all chats/channels/groups"),
         ("5", "Manage API Configuration"),
         ("6", "Manage Accounts"),
-        ("7", "Exit")
+        ("7", "Watch channels for new media"),
+        ("8", "Download Settings"),
+        ("9", "Exit")
     ]
     menu_table = Table(show_header=False, box=None, padding=(0, 2))
     for option, description in menu_options:
@@ -422,22 +981,16 @@ async def get_channel_info(channel_input):
                 await client.start(phone=phone_number)
 
         channel = await client.get_entity(channel_input)
-        video_count = 0
-        image_count = 0
-        file_count = 0
-        async for message in client.iter_messages(channel):
-            if message.media:
-                if isinstance(message.media, types.MessageMediaPhoto):
-                    image_count += 1
-                elif isinstance(message.media, types.MessageMediaDocument):
-                    attributes = message.media.document.attributes
-                    if any(isinstance(attr, types.DocumentAttributeVideo) for attr in attributes):
-                        video_count += 1
-                    else:
-                        file_count += 1
+        await sync_media_index(channel)
+        conn = open_media_index()
+        try:
+            counts = dict(conn.execute(
+                "SELECT type, COUNT(*) FROM media WHERE channel_id = ? GROUP BY type", (channel.id,)).fetchall())
+        finally:
+            conn.close()
 
         channel_name = channel.title if hasattr(channel, "title") else "Unknown"
-        return video_count, image_count, file_count, channel_name
+        return counts.get("video", 0), counts.get("photo", 0), counts.get("document", 0), channel_name
     except Exception as e:
         logging.error(f"Error fetching channel info: {e}")
         console.print(f"[red]Error: {e}[/red]")
@@ -451,21 +1004,23 @@ async def get_timeline_overview(channel_input, start_date=None, end_date=None):
                 await client.start(phone=phone_number)
 
         channel = await client.get_entity(channel_input)
+        await sync_media_index(channel)
+        where, params = get_date_filter(start_date, end_date)
+        conn = open_media_index()
+        try:
+            rows = conn.execute(
+                f"SELECT substr(date, 1, 10) AS day, type, COUNT(*) FROM media WHERE channel_id = ?{where} "
+                f"GROUP BY day, type ORDER BY day", (channel.id, *params)).fetchall()
+        finally:
+            conn.close()
+
         timeline = {}
-        async for message in client.iter_messages(channel):
-            message_date = message.date.strftime("%d/%m/%Y")
-            if (not start_date and not end_date) or (start_date and end_date and start_date <= message_date <= end_date) or (start_date and not end_date and message_date == start_date):
-                if message.media:
-                    if message_date not in timeline:
-                        timeline[message_date] = {"videos": 0, "images": 0, "files": 0}
-                    if isinstance(message.media, types.MessageMediaPhoto):
-                        timeline[message_date]["images"] += 1
-                    elif isinstance(message.media, types.MessageMediaDocument):
-                        attributes = message.media.document.attributes
-                        if any(isinstance(attr, types.DocumentAttributeVideo) for attr in attributes):
-                            timeline[message_date]["videos"] += 1
-                        else:
-                            timeline[message_date]["files"] += 1
+        type_keys = {"video": "videos", "photo": "images", "document": "files"}
+        for day, media_type, count in rows:
+            message_date = datetime.strptime(day, "%Y-%m-%d").strftime("%d/%m/%Y")
+            if message_date not in timeline:
+                timeline[message_date] = {"videos": 0, "images": 0, "files": 0}
+            timeline[message_date][type_keys[media_type]] += count
 
         return timeline, channel.title if hasattr(channel, "title") else "Unknown"
     except Exception as e:
@@ -481,53 +1036,9 @@ async def get_detailed_timeline(channel_input, start_date=None, end_date=None):
                 await client.start(phone=phone_number)
 
         channel = await client.get_entity(channel_input)
-        detailed_timeline = []
-        async for message in client.iter_messages(channel):
-            message_date = message.date.strftime("%d/%m/%Y")
-
-            if (not start_date and not end_date) or (start_date and end_date and start_date <= message_date <= end_date) or (start_date and not end_date and message_date == start_date):
-                if message.media:
-                    file_info = {
-                        "type": "File",
-                        "name": None,
-                        "size": None,
-                        "extension": None,
-                        "resolution": None,
-                        "duration": None
-                    }
-                    if hasattr(message.file, "name") and message.file.name:
-                        file_info["name"] = message.file.name
-                        file_info["extension"] = os.path.splitext(message.file.name)[1].lower()
-                    else:
-                        file_info["name"] = f"File_{message.id}"
-                        file_info["extension"] = "Unknown"
-
-                    if hasattr(message.file, "size"):
-                        file_info["size"] = format_size(message.file.size)
-                    else:
-                        file_info["size"] = "Unknown size"
-
-                    if isinstance(message.media, types.MessageMediaPhoto):
-                        file_info["type"] = "Image"
-                        if hasattr(message.media, "photo") and hasattr(message.media.photo, "sizes"):
-                            for size in message.media.photo.sizes:
-                                if hasattr(size, "w") and hasattr(size, "h"):
-                                    file_info["resolution"] = f"{size.w}x{size.h}"
-                                    break
-
-                    elif isinstance(message.media, types.MessageMediaDocument):
-                        attributes = message.media.document.attributes
-                        if any(isinstance(attr, types.DocumentAttributeVideo) for attr in attributes):
-                            file_info["type"] = "Video"
-                            file_info["duration"] = get_video_duration(attributes)
-                            for attr in attributes:
-                                if isinstance(attr, types.DocumentAttributeVideo):
-                                    file_info["resolution"] = f"{attr.w}x{attr.h}"
-                                    break
-
-                    detailed_timeline.append(file_info)
-
-        return detailed_timeline
+        await sync_media_index(channel)
+        where, params = get_date_filter(start_date, end_date)
+        return [get_file_info(row) for row in query_media_index(channel, where, params, order_by="date DESC")]
     except Exception as e:
         logging.error(f"Error fetching detailed timeline: {e}")
         console.print(f"[red]Error: {e}[/red]")
@@ -542,14 +1053,22 @@ async def download_by_name(channel_input, file_name):
 
         downloaded_files = get_downloaded_files()
         semaphore = asyncio.Semaphore(10)
-        matching_messages = []
-        async for message in client.iter_messages(channel_input):
-            if message.media:
-                current_file_name = message.file.name or f"File_{message.id}"
-                if file_name.lower() in current_file_name.lower():
-                    matching_messages.append(message)
-
-        if not matching_messages:
+        channel = await client.get_entity(channel_input)
+        if is_channel_indexed(channel):
+            await sync_media_index(channel)
+            pattern = "%" + file_name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            matching_rows = query_media_index(
+                channel, " AND COALESCE(name, 'File_' || message_id) LIKE ? ESCAPE '\\'", (pattern,),
+                order_by="date DESC")
+        else:
+            matching_rows = []
+            async for message in client.iter_messages(channel, search=file_name):
+                if get_media_type(message):
+                    row = get_media_row(message)
+                    if file_name.lower() in (row[3] or f"File_{row[0]}").lower():
+                        matching_rows.append(row)
+
+        if not matching_rows:
             console.print(f"[yellow]No files found containing '{file_name}'.[/yellow]")
             return
 
@@ -561,45 +1080,8 @@ async def download_by_name(channel_input, file_name):
         table.add_column("Extension", justify="center")
         table.add_column("Resolution", justify="center")
         table.add_column("Duration", justify="center")
-        for index, message in enumerate(matching_messages, start=1):
-            file_info = {
-                "type": "File",
-                "name": None,
-                "size": None,
-                "extension": None,
-                "resolution": None,
-                "duration": None
-            }
-            if hasattr(message.file, "name") and message.file.name:
-                file_info["name"] = message.file.name
-                file_info["extension"] = os.path.splitext(message.file.name)[1].lower()
-            else:
-                file_info["name"] = f"File_{message.id}"
-                file_info["extension"] = "Unknown"
-
-            if hasattr(message.file, "size"):
-                file_info["size"] = format_size(message.file.size)
-            else:
-                file_info["size"] = "Unknown size"
-
-            if isinstance(message.media, types.MessageMediaPhoto):
-                file_info["type"] = "Image"
-                if hasattr(message.media, "photo") and hasattr(message.media.photo, "sizes"):
-                    for size in message.media.photo.sizes:
-                        if hasattr(size, "w") and hasattr(size, "h"):
-                            file_info["resolution"] = f"{size.w}x{size.h}"
-                            break
-
-            elif isinstance(message.media, types.MessageMediaDocument):
-                attributes = message.media.document.attributes
-                if any(isinstance(attr, types.DocumentAttributeVideo) for attr in attributes):
-                    file_info["type"] = "Video"
-                    file_info["duration"] = get_video_duration(attributes)
-                    for attr in attributes:
-                        if isinstance(attr, types.DocumentAttributeVideo):
-                            file_info["resolution"] = f"{attr.w}x{attr.h}"
-                            break
-
+        for index, row in enumerate(matching_rows, start=1):
+            file_info = get_file_info(row)
             table.add_row(
                 str(index),
                 file_info["type"],
@@ -620,46 +1102,33 @@ async def download_by_name(channel_input, file_name):
                 console.print("[yellow]Download cancelled.[/yellow]")
                 return
             elif choice == "all":
-                selected_indices = range(len(matching_messages))
+                selected_indices = range(len(matching_rows))
                 break
             else:
                 try:
                     selected_indices = [int(idx.strip()) - 1 for idx in choice.split(",")]
-                    if all(0 <= idx < len(matching_messages) for idx in selected_indices):
+                    if all(0 <= idx < len(matching_rows) for idx in selected_indices):
                         break
                     else:
                         console.print("[red]Invalid file numbers. Please try again.[/red]")
                 except ValueError:
                     console.print("[red]Invalid input. Please enter numbers separated by commas.[/red]")
 
-        with Progress(
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-            TimeRemainingColumn(),
-            console=console
-        ) as progress:
-            total_size = sum(message.file.size for message in [matching_messages[idx] for idx in selected_indices])
-            overall_task = progress.add_task(f"[green]Downloading {len(selected_indices)} files ({format_size(total_size)})...", total=total_size)
-            for idx in selected_indices:
-                message = matching_messages[idx]
-                current_file_name = message.file.name or f"File_{message.id}"
-                file_size = message.file.size if message.file else 0
-                file_size_str = format_size(file_size)
-
-                if isinstance(message.media, types.MessageMediaPhoto):
-                    media_type = "photo"
-                elif isinstance(message.media, types.MessageMediaDocument):
-                    if any(isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes):
-                        media_type = "video"
-                    else:
-                        media_type = "document"
-                else:
-                    media_type = "file"
-
-                task_id = progress.add_task(f"[cyan]Downloading {current_file_name} ({file_size_str})...", total=file_size)
-                await download_media(message, downloaded_files, semaphore, media_type, progress, task_id)
-                progress.update(overall_task, advance=file_size)
+        selected_rows = [matching_rows[idx] for idx in selected_indices]
+        messages = await client.get_messages(channel, ids=[row[0] for row in selected_rows])
+        with create_download_progress() as progress:
+            total_size = sum(row[4] or 0 for row in selected_rows)
+            tracker = start_progress_tracker(progress, len(selected_rows), total_size, "[green]Downloading files")
+            try:
+                for row, message in zip(selected_rows, messages):
+                    if message is None or not message.media:
+                        console.print(f"[yellow]Message {row[0]} is no longer available, skipping.[/yellow]")
+                        tracker["finished_files"] += 1
+                        tracker["total_bytes"] -= row[4] or 0
+                        continue
+                    await download_media(message, downloaded_files, semaphore, row[2], tracker)
+            finally:
+                await stop_progress_tracker(tracker)
 
         console.print(f"[green]Download completed.[/green]")
     except Exception as e:
@@ -726,7 +1195,8 @@ def display_download_menu():
         ("3", "Download All File"),
         ("4", "Download by Name"),
         ("5", "Download by Date Range"),
-        ("6", "Back to Previous Menu")
+        ("6", "Sharded Download with All Accounts"),
+        ("7", "Back to Previous Menu")
     ]
     menu_table = Table(show_header=False, box=None, padding=(0, 2))
     for option, description in menu_options:
@@ -744,25 +1214,23 @@ async def search_by_size(channel_input, size_gb, search_type, tolerance=0.05, si
             if not await client.is_user_authorized():
                 await client.start(phone=phone_number)
 
+        channel = await client.get_entity(channel_input)
+        await sync_media_index(channel)
         size_bytes = size_gb * 1024 * 1024 * 1024
         tolerance_bytes = tolerance * 1024 * 1024 * 1024
-        matching_messages = []
-        async for message in client.iter_messages(channel_input):
-            if message.media and hasattr(message.file, "size"):
-                file_size = message.file.size
-                if search_type == "less" and file_size < size_bytes:
-                    matching_messages.append(message)
-                elif search_type == "greater" and file_size > size_bytes:
-                    matching_messages.append(message)
-                elif search_type == "equal" and abs(file_size - size_bytes) <= tolerance_bytes:
-                    matching_messages.append(message)
-                elif search_type == "range" and size_range:
-                    min_size_bytes = size_range[0] * 1024 * 1024 * 1024
-                    max_size_bytes = size_range[1] * 1024 * 1024 * 1024
-                    if min_size_bytes <= file_size <= max_size_bytes:
-                        matching_messages.append(message)
-
-        if not matching_messages:
+        if search_type == "less":
+            where, params = " AND size < ?", (size_bytes,)
+        elif search_type == "greater":
+            where, params = " AND size > ?", (size_bytes,)
+        elif search_type == "equal":
+            where, params = " AND size BETWEEN ? AND ?", (size_bytes - tolerance_bytes, size_bytes + tolerance_bytes)
+        elif search_type == "range" and size_range:
+            where, params = " AND size BETWEEN ? AND ?", (size_range[0] * 1024 * 1024 * 1024, size_range[1] * 1024 * 1024 * 1024)
+        else:
+            return
+        matching_rows = query_media_index(channel, where, params, order_by="size")
+
+        if not matching_rows:
             if search_type == "range":
                 console.print(f"[yellow]No files found within the size range {size_range[0]} GB to {size_range[1]} GB.[/yellow]")
             else:
@@ -776,45 +1244,8 @@ async def search_by_size(channel_input, size_gb, search_type, tolerance=0.05, si
         table.add_column("Extension", justify="center")
         table.add_column("Resolution", justify="center")
         table.add_column("Duration", justify="center")
-        for message in matching_messages:
-            file_info = {
-                "type": "File",
-                "name": None,
-                "size": None,
-                "extension": None,
-                "resolution": None,
-                "duration": None
-            }
-            if hasattr(message.file, "name") and message.file.name:
-                file_info["name"] = message.file.name
-                file_info["extension"] = os.path.splitext(message.file.name)[1].lower()
-            else:
-                file_info["name"] = f"File_{message.id}"
-                file_info["extension"] = "Unknown"
-
-            if hasattr(message.file, "size"):
-                file_info["size"] = format_size(message.file.size)
-            else:
-                file_info["size"] = "Unknown size"
-
-            if isinstance(message.media, types.MessageMediaPhoto):
-                file_info["type"] = "Image"
-                if hasattr(message.media, "photo") and hasattr(message.media.photo, "sizes"):
-                    for size in message.media.photo.sizes:
-                        if hasattr(size, "w") and hasattr(size, "h"):
-                            file_info["resolution"] = f"{size.w}x{size.h}"
-                            break
-
-            elif isinstance(message.media, types.MessageMediaDocument):
-                attributes = message.media.document.attributes
-                if any(isinstance(attr, types.DocumentAttributeVideo) for attr in attributes):
-                    file_info["type"] = "Video"
-                    file_info["duration"] = get_video_duration(attributes)
-                    for attr in attributes:
-                        if isinstance(attr, types.DocumentAttributeVideo):
-                            file_info["resolution"] = f"{attr.w}x{attr.h}"
-                            break
-
+        for row in matching_rows:
+            file_info = get_file_info(row)
             table.add_row(
                 file_info["type"],
                 shorten(file_info["name"], width=30, placeholder="..."),
@@ -825,7 +1256,7 @@ async def search_by_size(channel_input, size_gb, search_type, tolerance=0.05, si
             )
 
         console.print(table)
-        console.print(f"[green]Total files found: {len(matching_messages)}[/green]")
+        console.print(f"[green]Total files found: {len(matching_rows)}[/green]")
     except Exception as e:
         logging.error(f"Error searching by file size: {e}")
         console.print(f"[red]Error: {e}[/red]")
@@ -851,7 +1282,25 @@ def display_size_search_menu():
 
     console.print(Panel(menu_table, title="Size Search Menu", border_style="blue"))
 
-async def list_all_chats_with_member_count():
+def load_member_counts():
+    if os.path.exists(member_count_file):
+        with open(member_count_file, 'r') as file:
+            return json.load(file)
+    return {}
+
+def save_member_counts(member_counts):
+    with open(member_count_file, 'w') as file:
+        json.dump(member_counts, file, indent=4)
+
+async def fetch_member_count(dialog, semaphore):
+    async with semaphore:
+        if dialog.is_channel:
+            full_channel = await client(functions.channels.GetFullChannelRequest(dialog.entity))
+            return full_channel.full_chat.participants_count
+        participants = await client.get_participants(dialog.entity, limit=0)
+        return participants.total
+
+async def list_all_chats_with_member_count(cache_ttl=3600, max_concurrency=10):
     try:
         if not client.is_connected():
             await client.connect()
@@ -859,6 +1308,33 @@ async def list_all_chats_with_member_count():
                 await client.start(phone=phone_number)
 
         dialogs = await client.get_dialogs()
+        cached_counts = load_member_counts()
+        member_counts = {}
+        pending_dialogs = []
+        now = time.time()
+        for dialog in dialogs:
+            if not (dialog.is_group or dialog.is_channel):
+                continue
+            cached = cached_counts.get(str(dialog.id))
+            if cached and now - cached["time"] < cache_ttl:
+                member_counts[dialog.id] = cached["count"]
+            elif getattr(dialog.entity, "participants_count", None):
+                member_counts[dialog.id] = dialog.entity.participants_count
+            else:
+                pending_dialogs.append(dialog)
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+        results = await asyncio.gather(*(fetch_member_count(dialog, semaphore) for dialog in pending_dialogs), return_exceptions=True)
+        for dialog, result in zip(pending_dialogs, results):
+            if isinstance(result, Exception):
+                logging.error(f"Error getting member count for chat {dialog.id}: {result}")
+                console.print(f"[yellow]No permission to get member count for {dialog.name}.[/yellow]")
+                member_counts[dialog.id] = "No Permission"
+            else:
+                member_counts[dialog.id] = result
+                cached_counts[str(dialog.id)] = {"count": result, "time": now}
+        save_member_counts(cached_counts)
+
         table = Table(title="All Chats/Channels/Groups")
         table.add_column("Chat Name", justify="left")
         table.add_column("Chat ID", justify="center")
@@ -870,18 +1346,7 @@ async def list_all_chats_with_member_count():
             chat_id = dialog.id
             last_message_id = dialog.message.id if hasattr(dialog, "message") else "N/A"
             chat_type = "Channel" if dialog.is_channel else "Group" if dialog.is_group else "Private Chat"
-            member_count = "N/A"
-            if dialog.is_group or dialog.is_channel:
-                try:
-                    participants = await client.get_participants(dialog.entity)
-                    member_count = len(participants)
-                except Exception as e:
-                    if dialog.is_channel and hasattr(dialog.entity, "participants_count"):
-                        member_count = dialog.entity.participants_count
-                    else:
-                        logging.error(f"Error getting member count for chat {chat_id}: {e}")
-                        console.print(f"[yellow]No permission to get member count for {chat_name}.[/yellow]")
-                        member_count = "No Permission"
+            member_count = member_counts.get(chat_id, "N/A")
 
             table.add_row(
                 chat_name,
@@ -907,59 +1372,423 @@ async def download_by_chat_id(chat_id, media_type, start_date=None, end_date=Non
     success_count = 0
     try:
         chat_entity = await client.get_entity(chat_id)
-        messages = [
-            message async for message in client.iter_messages(chat_entity)
-            if message.media and (
-                (media_type == "photo" and isinstance(message.media, types.MessageMediaPhoto)) or
-                (media_type == "video" and isinstance(message.media, types.MessageMediaDocument) and
-                 any(isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes)) or
-                (media_type == "document" and isinstance(message.media, types.MessageMediaDocument) and
-                 not any(isinstance(attr, types.DocumentAttributeVideo) for attr in message.media.document.attributes))
-            )
-        ]
-        if start_date and end_date:
-            start_date_obj = datetime.strptime(start_date, "%d/%m/%Y")
-            end_date_obj = datetime.strptime(end_date, "%d/%m/%Y")
-            messages = [
-                message for message in messages
-                if start_date_obj <= message.date.replace(tzinfo=None) <= end_date_obj
-            ]
+        messages = order_messages([message async for message in iter_media_messages(chat_entity, media_type, start_date, end_date)])
 
         total_files = len(messages)
         if total_files == 0:
             console.print(f"[yellow]No {media_type}s found to download.[/yellow]")
             return
 
-        with Progress(
-            TextColumn("[progress.description]{task.description}"),
-            BarColumn(),
-            TaskProgressColumn(),
-            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-            TimeRemainingColumn(),
-            console=console
-        ) as progress:
-            overall_task = progress.add_task(f"[green]Downloading {total_files} {media_type}s...", total=total_files)
-            file_tasks = {}
-            for message in messages:
-                file_name = message.file.name or f"{media_type}_{message.id}"
-                file_tasks[message.id] = progress.add_task(f"[cyan]{file_name}", total=message.file.size)
-            for message in messages:
-                file_name = await download_media(message, downloaded_files, semaphore, media_type, progress, file_tasks[message.id])
-                if file_name:
-                    success_count += 1
-                    progress.update(overall_task, advance=1)
+        total_bytes = sum(message.file.size or 0 for message in messages)
+        with create_download_progress() as progress:
+            tracker = start_progress_tracker(progress, total_files, total_bytes, f"[green]Downloading {media_type}s")
+            try:
+                success_count = await download_all(messages, downloaded_files, semaphore, media_type, tracker)
+            finally:
+                await stop_progress_tracker(tracker)
 
         console.print(f"[green]Downloaded {success_count} {media_type}s out of {total_files}.[/green]")
     except Exception as e:
         logging.error(f"Error downloading {media_type}s: {e}")
         console.print(f"[red]Error downloading {media_type}s: {e}[/red]")
 
+async def connect_account(account):
+    account_client = TelegramClient(account["session_file"], account["api_id"], account["api_hash"], flood_sleep_threshold=0)
+    await account_client.connect()
+    if not await account_client.is_user_authorized():
+        await account_client.start(phone=account["phone_number"])
+    return account_client
+
+async def shard_worker(account, account_client, entity, queue, flood_state, downloaded_files, media_type, tracker, results, account_count):
+    while True:
+        delay = flood_state[account["phone_number"]] - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+            continue
+        message_id, file_size, tried_accounts = await queue.get()
+        try:
+            if account["phone_number"] in tried_accounts:
+                # Leave the message for an account that has not failed on it yet
+                queue.put_nowait((message_id, file_size, tried_accounts))
+                await asyncio.sleep(1)
+                continue
+            message = await account_client.get_messages(entity, ids=message_id)
+            if message is None or not message.media:
+                raise ValueError("message not available to this account")
+            file_name = await download_media(message, downloaded_files, None, media_type, tracker,
+                                             telegram_client=account_client, wait_on_flood=False, count_failure=False)
+            if not file_name:
+                raise ValueError("download failed")
+            results[account["phone_number"]] += 1
+        except errors.FloodWaitError as e:
+            flood_state[account["phone_number"]] = time.monotonic() + e.seconds
+            logging.warning(f"Account {account['phone_number']} hit FLOOD_WAIT of {e.seconds}s, requeueing message {message_id}")
+            console.print(f"[yellow]Account {account['phone_number']} is flood-waited for {e.seconds}s, other accounts take over.[/yellow]")
+            queue.put_nowait((message_id, file_size, tried_accounts))
+        except Exception as e:
+            tried_accounts = tried_accounts | {account["phone_number"]}
+            if len(tried_accounts) < account_count:
+                logging.warning(f"Account {account['phone_number']} failed on message {message_id}: {e}, requeueing for another account")
+                queue.put_nowait((message_id, file_size, tried_accounts))
+            else:
+                # Failures are only counted once the last account has given up on the message
+                count_file_finished(tracker, file_size, False)
+                logging.error(f"Message {message_id} failed on every account, last error from {account['phone_number']}: {e}")
+        finally:
+            queue.task_done()
+
+async def download_sharded(channel_input, media_type, start_date=None, end_date=None, workers_per_account=5):
+    if not client.is_connected():
+        await client.connect()
+        if not await client.is_user_authorized():
+            await client.start(phone=phone_number)
+
+    primary_entity = await client.get_entity(channel_input)
+    if not isinstance(primary_entity, types.Channel):
+        # Only channels and supergroups share message ids between users; basic groups and private chats do not
+        console.print("[yellow]Sharding needs a channel or supergroup, downloading with the primary account instead.[/yellow]")
+        await download_by_type(primary_entity, media_type, start_date, end_date)
+        return
+
+    account_clients = []
+    workers = []
+    flood_sleep_threshold = client.flood_sleep_threshold
+    primary_session = os.path.abspath(client.session.filename)
+    try:
+        queue = asyncio.Queue()
+        total_bytes = 0
+        messages = order_messages([message async for message in iter_media_messages(primary_entity, media_type, start_date, end_date)])
+        for message in messages:
+            queue.put_nowait((message.id, message.file.size or 0, frozenset()))
+            total_bytes += message.file.size or 0
+        total_files = queue.qsize()
+        if total_files == 0:
+            console.print(f"[yellow]No {media_type}s found to download.[/yellow]")
+            return
+
+        for account in load_accounts():
+            try:
+                if os.path.abspath(account["session_file"]) == primary_session:
+                    # A second client on the same session file would fight over its SQLite database
+                    client.flood_sleep_threshold = 0
+                    account_client = client
+                else:
+                    account_client = await connect_account(account)
+                entity = await account_client.get_entity(channel_input)
+                if not isinstance(entity, types.Channel) or entity.id != primary_entity.id:
+                    raise ValueError("resolves to a different chat")
+                account_clients.append((account, account_client, entity))
+            except Exception as e:
+                logging.error(f"Account {account['phone_number']} cannot access {channel_input}: {e}")
+                console.print(f"[yellow]Skipping account {account['phone_number']}: {e}[/yellow]")
+        if not account_clients:
+            console.print("[red]No stored account can access this channel.[/red]")
+            return
+
+        console.print(f"[green]Sharding {total_files} {media_type}s across {len(account_clients)} accounts...[/green]")
+        downloaded_files = get_downloaded_files()
+        flood_state = {account["phone_number"]: 0.0 for account, _, _ in account_clients}
+        results = {account["phone_number"]: 0 for account, _, _ in account_clients}
+        with create_download_progress() as progress:
+            tracker = start_progress_tracker(progress, total_files, total_bytes, f"[green]Downloading {media_type}s")
+            try:
+                for account, account_client, entity in account_clients:
+                    for _ in range(workers_per_account):
+                        workers.append(asyncio.create_task(shard_worker(
+                            account, account_client, entity, queue, flood_state, downloaded_files, media_type,
+                            tracker, results, len(account_clients))))
+                await queue.join()
+            finally:
+                await stop_progress_tracker(tracker)
+
+        for account_phone, count in results.items():
+            console.print(f"[cyan]{account_phone}: {count} {media_type}s[/cyan]")
+        console.print(f"[green]Downloaded {sum(results.values())} {media_type}s out of {total_files}.[/green]")
+    except Exception as e:
+        logging.error(f"Error in sharded download of {media_type}s: {e}")
+        console.print(f"[red]Error downloading {media_type}s: {e}[/red]")
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        client.flood_sleep_threshold = flood_sleep_threshold
+        for _, account_client, _ in account_clients:
+            if account_client is not client and account_client.is_connected():
+                await account_client.disconnect()
+
+def emit_event(event, **fields):
+    print(json.dumps({"event": event, "time": datetime.now().isoformat(timespec="seconds"), **fields}), flush=True)
+
+def load_job_file(job_file):
+    with open(job_file, 'r') as file:
+        spec = json.load(file)
+    if isinstance(spec, list):
+        spec = {"jobs": spec}
+    jobs = []
+    for index, job in enumerate(spec.get("jobs", []), start=1):
+        if not job.get("channel"):
+            raise ValueError(f"Job {index} has no channel")
+        media_types = job.get("media_types", list(media_filters))
+        invalid_types = [media_type for media_type in media_types if media_type not in media_filters]
+        if invalid_types:
+            raise ValueError(f"Job {index} has invalid media types: {', '.join(invalid_types)}")
+        layout = job.get("layout", "type")
+        if layout not in ("type", "channel"):
+            raise ValueError(f"Job {index} has invalid layout: {layout}")
+        start_date = job.get("start_date")
+        end_date = job.get("end_date") or start_date
+        for date in (start_date, end_date):
+            if date:
+                datetime.strptime(date, "%d/%m/%Y")
+        jobs.append({
+            "channel": job["channel"],
+            "media_types": media_types,
+            "start_date": start_date,
+            "end_date": end_date,
+            "min_size": float(job.get("min_size_gb", 0)) * 1024 ** 3,
+            "max_size": float(job["max_size_gb"]) * 1024 ** 3 if job.get("max_size_gb") is not None else None,
+            "layout": layout
+        })
+    if not jobs:
+        raise ValueError("Job file contains no jobs")
+    return spec, jobs
+
+async def run_download_job(job_index, job, downloaded_files, semaphore, max_pending):
+    counts = {"downloaded": 0, "skipped": 0, "no_space": 0, "failed": 0, "filtered": 0, "bytes": 0}
+    entity = await client.get_entity(job["channel"])
+    output_root = None
+    if job["layout"] == "channel":
+        output_root = os.path.join(output_folder, re.sub(r'[^\w.-]+', '_', str(job["channel"])))
+    emit_event("job_started", job=job_index, channel=str(job["channel"]), media_types=job["media_types"])
+
+    async def download_one(message, media_type, file_size):
+        try:
+            file_name = await download_media(message, downloaded_files, semaphore, media_type,
+                                             output_root=output_root, raise_on_no_space=True)
+        except OSError as e:
+            if e.errno != errno.ENOSPC:
+                logging.error(f"Job {job_index}: error downloading message {message.id}: {e}")
+                counts["failed"] += 1
+                emit_event("file_failed", job=job_index, message_id=message.id, media_type=media_type)
+                return
+            counts["no_space"] += 1
+            emit_event("file_skipped", job=job_index, message_id=message.id, media_type=media_type, reason="no_space", size=file_size)
+            return
+        except Exception as e:
+            logging.error(f"Job {job_index}: error downloading message {message.id}: {e}")
+            file_name = None
+        if file_name:
+            counts["downloaded"] += 1
+            counts["bytes"] += file_size
+            emit_event("file_done", job=job_index, message_id=message.id, media_type=media_type, file=file_name, size=file_size)
+        else:
+            counts["failed"] += 1
+            emit_event("file_failed", job=job_index, message_id=message.id, media_type=media_type)
+
+    pending = set()
+    for media_type in job["media_types"]:
+        async for message in iter_scheduled_messages(entity, media_type, job["start_date"], job["end_date"]):
+            file_size = message.file.size if message.file else 0
+            if file_size < job["min_size"] or (job["max_size"] is not None and file_size > job["max_size"]):
+                counts["filtered"] += 1
+                continue
+            if get_message_key(message) in downloaded_files:
+                counts["skipped"] += 1
+                emit_event("file_skipped", job=job_index, message_id=message.id, media_type=media_type, reason="already_downloaded")
+                continue
+            if len(pending) >= max_pending:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(download_one(message, media_type, file_size)))
+    if pending:
+        await asyncio.wait(pending)
+
+    emit_event("job_done", job=job_index, **counts)
+    return counts
+
+def get_job_account(account_phone=None):
+    stored_accounts = load_accounts()
+    if account_phone:
+        for account in stored_accounts:
+            if account["phone_number"] == str(account_phone):
+                return account
+        raise ValueError(f"No stored account with phone number {account_phone}")
+    # Same default as the interactive menu, which downloads with the first stored account
+    return stored_accounts[0] if stored_accounts else None
+
+async def run_batch(job_file):
+    global console, client
+    console = Console(stderr=True)
+    try:
+        spec, jobs = load_job_file(job_file)
+        settings = load_scheduler_settings()
+        settings.update({key: spec[key] for key in scheduler_defaults if key in spec})
+        configure_download_scheduler(settings)
+        account = get_job_account(spec.get("account"))
+    except (OSError, ValueError) as e:
+        emit_event("error", message=f"Invalid job file {job_file}: {e}")
+        return 2
+
+    if account:
+        client = TelegramClient(account["session_file"], account["api_id"], account["api_hash"])
+        login_hint = (f"run the script without --jobs, make {account['phone_number']} the current account "
+                      f"(Manage Accounts) and open any channel with option 1, 2 or 3 once")
+    else:
+        login_hint = "run the script without --jobs and use option 4 (List all chats/channels/groups) once"
+
+    max_concurrency = int(spec.get("max_concurrency", 20))
+    semaphore = asyncio.Semaphore(max_concurrency)
+    downloaded_files = get_downloaded_files()
+    try:
+        await client.connect()
+        if not await client.is_user_authorized():
+            emit_event("error", message=f"Session {client.session.filename} is not authorized. To log in, {login_hint}")
+            return 2
+        results = await asyncio.gather(
+            *(run_download_job(index, job, downloaded_files, semaphore, max_concurrency * 2)
+              for index, job in enumerate(jobs, start=1)),
+            return_exceptions=True)
+    finally:
+        if client.is_connected():
+            await client.disconnect()
+
+    exit_code = 0
+    totals = {"downloaded": 0, "skipped": 0, "no_space": 0, "failed": 0, "filtered": 0, "bytes": 0}
+    for index, result in enumerate(results, start=1):
+        if isinstance(result, Exception):
+            logging.error(f"Job {index} failed: {result}")
+            emit_event("job_failed", job=index, message=str(result))
+            exit_code = 1
+            continue
+        for key in totals:
+            totals[key] += result[key]
+        if result["failed"]:
+            exit_code = 1
+    if exit_code == 0 and totals["no_space"]:
+        exit_code = 3
+    emit_event("summary", jobs=len(jobs), exit_code=exit_code, **totals)
+    return exit_code
+
+def load_watch_state():
+    if os.path.exists(watch_state_file):
+        with open(watch_state_file, 'r') as file:
+            return json.load(file)
+    return {}
+
+def save_watch_state(watch_state):
+    with open(watch_state_file, 'w') as file:
+        json.dump(watch_state, file, indent=4)
+
+async def watch_channels(channel_inputs, media_types=None, max_concurrency=5, reconnect_delay=10):
+    media_types = set(media_types or media_filters)
+    watch_state = load_watch_state()
+    downloaded_files = get_downloaded_files()
+    semaphore = asyncio.Semaphore(max_concurrency)
+    queue = asyncio.Queue()
+    entities = {}
+    seen_ids = {}
+    in_flight = {}
+    failed = {}
+
+    def checkpoint(peer_id):
+        # Failed messages hold the watermark back so the catch-up after a reconnect retries them
+        watermark = watch_state.get(str(peer_id), 0)
+        pending = in_flight[peer_id] | failed[peer_id]
+        if pending:
+            watermark = max(watermark, min(pending) - 1)
+        elif seen_ids[peer_id]:
+            watermark = max(watermark, max(seen_ids[peer_id]))
+        watch_state[str(peer_id)] = watermark
+        seen_ids[peer_id] = {message_id for message_id in seen_ids[peer_id] if message_id > watermark}
+        save_watch_state(watch_state)
+
+    def enqueue(peer_id, message):
+        if message.id <= watch_state.get(str(peer_id), 0) or message.id in seen_ids[peer_id]:
+            return
+        if get_message_key(message) in downloaded_files:
+            return
+        media_type = get_media_type(message)
+        if media_type not in media_types:
+            return
+        seen_ids[peer_id].add(message.id)
+        failed[peer_id].discard(message.id)
+        in_flight[peer_id].add(message.id)
+        queue.put_nowait((peer_id, message, media_type))
+
+    async def on_new_message(event):
+        if event.chat_id in entities:
+            enqueue(event.chat_id, event.message)
+
+    async def download_worker():
+        while True:
+            peer_id, message, media_type = await queue.get()
+            succeeded = False
+            try:
+                if await download_media(message, downloaded_files, semaphore, media_type):
+                    downloaded_files.add(get_message_key(message))
+                    succeeded = True
+            except Exception as e:
+                logging.error(f"Watcher failed to download message {message.id} from {peer_id}: {e}")
+            finally:
+                in_flight[peer_id].discard(message.id)
+                if not succeeded:
+                    failed[peer_id].add(message.id)
+                    seen_ids[peer_id].discard(message.id)
+                checkpoint(peer_id)
+                queue.task_done()
+
+    workers = [asyncio.create_task(download_worker()) for _ in range(max_concurrency)]
+    try:
+        while True:
+            try:
+                if not client.is_connected():
+                    await client.connect()
+                    if not await client.is_user_authorized():
+                        await client.start(phone=phone_number)
+                if not entities:
+                    for channel_input in channel_inputs:
+                        try:
+                            entity = await client.get_entity(channel_input)
+                        except (ValueError, TypeError, errors.RPCError) as e:
+                            logging.error(f"Cannot watch {channel_input}: {e}")
+                            console.print(f"[red]Cannot watch {channel_input}: {e}[/red]")
+                            continue
+                        peer_id = await client.get_peer_id(entity)
+                        entities[peer_id] = entity
+                        seen_ids[peer_id] = set()
+                        in_flight[peer_id] = set()
+                        failed[peer_id] = set()
+                        if str(peer_id) not in watch_state:
+                            latest_messages = await client.get_messages(entity, limit=1)
+                            watch_state[str(peer_id)] = latest_messages[0].id if latest_messages else 0
+                    if not entities:
+                        console.print("[red]None of the channels could be resolved, stopping the watcher.[/red]")
+                        return
+                    save_watch_state(watch_state)
+                client.add_event_handler(on_new_message, events.NewMessage(chats=list(entities.values())))
+                for peer_id, entity in entities.items():
+                    async for message in client.iter_messages(entity, min_id=watch_state[str(peer_id)], reverse=True):
+                        enqueue(peer_id, message)
+                console.print(f"[green]Watching {len(entities)} channels for new media. Press Ctrl+C to stop.[/green]")
+                await client.run_until_disconnected()
+            except (ConnectionError, OSError) as e:
+                logging.error(f"Watcher connection error: {e}")
+            finally:
+                client.remove_event_handler(on_new_message)
+            console.print(f"[yellow]Disconnected, reconnecting in {reconnect_delay}s...[/yellow]")
+            await asyncio.sleep(reconnect_delay)
+    finally:
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        if client.is_connected():
+            await client.disconnect()
+
 async def main():
     global accounts, client
     accounts = load_accounts()
     while True:
         display_main_menu()
-        choice = IntPrompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6", "7"])
+        choice = IntPrompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6", "7", "8", "9"])
         if choice in [1, 2, 3]:
             if not accounts:
                 console.print("[red]No accounts found. Please add an account first.[/red]")
@@ -982,8 +1811,8 @@ async def main():
                 if file_choice == 1:
                     while True:
                         display_download_menu()
-                        download_choice = IntPrompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6"])
-                        if download_choice == 6:
+                        download_choice = IntPrompt.ask("Enter your choice", choices=["1", "2", "3", "4", "5", "6", "7"])
+                        if download_choice == 7:
                             break
                         elif download_choice == 1:
                             await download_by_type(channel_input, "video")
@@ -1005,6 +1834,10 @@ async def main():
                                 await download_by_type(channel_input, "photo", start_date, end_date)
                             elif media_type_choice == 3:
                                 await download_by_type(channel_input, "document", start_date, end_date)
+                        elif download_choice == 6:
+                            media_type_choice = IntPrompt.ask(
+                                "Sharded Download Options:\n1. Video\n2. Image\n3. File\nEnter your choice", choices=["1", "2", "3"])
+                            await download_sharded(channel_input, {1: "video", 2: "photo", 3: "document"}[media_type_choice])
                 elif file_choice == 2:
                     console.print("[bold]Fetching channel information...[/bold]")
                     video_count, image_count, file_count, channel_name = await get_channel_info(channel_input)
@@ -1030,7 +1863,7 @@ async def main():
                             table.add_column("Videos", justify="center")
                             table.add_column("Images", justify="center")
                             table.add_column("Files", justify="center")
-                            for date, counts in sorted(timeline.items()):
+                            for date, counts in timeline.items():
                                 table.add_row(date, str(counts["videos"]), str(counts["images"]), str(counts["files"]))
                             console.print(table)
                         else:
@@ -1060,7 +1893,7 @@ async def main():
                             table.add_column("Videos", justify="center")
                             table.add_column("Images", justify="center")
                             table.add_column("Files", justify="center")
-                            for date, counts in sorted(timeline.items()):
+                            for date, counts in timeline.items():
                                 table.add_row(date, str(counts["videos"]), str(counts["images"]), str(counts["files"]))
                             console.print(table)
                         else:
@@ -1116,6 +1949,14 @@ async def main():
         elif choice == 6:
             await manage_accounts()
         elif choice == 7:
+            channel_inputs = [channel.strip() for channel in Prompt.ask("Enter channel names or links to watch (comma separated)").split(",") if channel.strip()]
+            try:
+                await watch_channels(channel_inputs)
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                console.print("[yellow]Stopped watching.[/yellow]")
+        elif choice == 8:
+            manage_download_settings()
+        elif choice == 9:
             console.print("[bold]Exiting the program.[/bold]")
             break
         else:
@@ -1124,4 +1965,30 @@ async def main():
             await client.disconnect()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(
+        description='Telegram Media Downloader',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='Job file example:\n'
+               '  {"max_concurrency": 20, "max_bytes_per_second": 10485760, "max_in_flight_bytes": 4294967296,\n'
+               '   "min_free_bytes": 1073741824, "order": "smallest", "account": "+84123456789",\n'
+               '   "jobs": [{"channel": "some_channel", "media_types": ["video", "photo"],\n'
+               '             "start_date": "01/01/2024", "end_date": "31/01/2024",\n'
+               '             "min_size_gb": 0, "max_size_gb": 2, "layout": "channel"}]}\n'
+               'Progress is printed as JSON lines. Exit codes: 0 success, 1 some downloads or jobs failed, 2 invalid job file or session,\n'
+               '3 files skipped because the disk was full.\n'
+               '"account" picks a stored account by phone number; the first stored account is used by default.')
+    parser.add_argument('-j', '--jobs', metavar='JOB_FILE', help='Run the download jobs in a JSON job file without the interactive menu')
+    parser.add_argument('-w', '--watch', nargs='+', metavar='CHANNEL', help='Watch channels and download new media as it is posted')
+    parser.add_argument('-m', '--media', nargs='+', choices=list(media_filters), help='Media types to download in watch mode (default: all)')
+    parser.add_argument('-c', '--catalog', action='store_true', help='Hash, extract IoCs from and thumbnail every downloaded file into catalog.db')
+    args = parser.parse_args()
+    configure_download_scheduler(load_scheduler_settings())
+    if args.jobs:
+        sys.exit(asyncio.run(with_post_processing(run_batch(args.jobs), args.catalog)))
+    if args.watch:
+        try:
+            asyncio.run(with_post_processing(watch_channels(args.watch, args.media), args.catalog))
+        except KeyboardInterrupt:
+            console.print("[yellow]Stopped watching.[/yellow]")
+        sys.exit(0)
+    asyncio.run(with_post_processing(main(), args.catalog))
\ No newline at end of file